@@ -10,11 +10,15 @@ from dotenv import load_dotenv
 from features.player_tracker import PlayerTracker
 from utils.rcon_client import RCONClient
 from utils.ftp_handler import FTPHandler
+from utils.game_db_snapshot import GameDBSnapshot
 from features.build_limit import BuildLimitTracker
 from features.classement_player import KillTracker
 from features.player_sync import PlayerSync
 from features.vote_tracker import VoteTracker
 from features.item_manager import ItemManager
+from features.player_roster import PlayerRoster
+from features.delivery_worker import DeliveryWorker
+from features.shop_catalog import ShopCatalog
 from database.init_database import init_database
 from config.logging_config import setup_logging
 import glob
@@ -54,7 +58,9 @@ print(f"- Password: {'*' * len(os.getenv('RCON_PASSWORD', '')) if os.getenv('RCO
 
 # Initialisation des clients et trackers
 rcon_client = RCONClient()
+player_roster = PlayerRoster(rcon_client)  # Joueurs connectés, partagés par les commandes et le salon
 ftp_handler = FTPHandler()
+game_db_snapshot = GameDBSnapshot(ftp_handler)  # Copie de game.db partagée entre les trackers
 
 @bot.event
 async def on_ready():
@@ -64,12 +70,15 @@ async def on_ready():
         await load_all_cogs(bot)
         
         # Initialisation des trackers
-        bot.player_tracker = PlayerTracker(bot=bot, channel_id=RENAME_CHANNEL_ID, rcon_client=rcon_client)  # type: ignore
-        bot.build_tracker = BuildLimitTracker(bot=bot, channel_id=BUILD_CHANNEL_ID, ftp_handler=ftp_handler)  # type: ignore
-        bot.kill_tracker = KillTracker(bot=bot, channel_id=KILLS_CHANNEL_ID)  # type: ignore
+        bot.rcon_client = rcon_client  # type: ignore
+        bot.player_tracker = PlayerTracker(bot=bot, channel_id=RENAME_CHANNEL_ID, rcon_client=rcon_client, roster=player_roster)  # type: ignore
+        bot.build_tracker = BuildLimitTracker(bot=bot, channel_id=BUILD_CHANNEL_ID, ftp_handler=ftp_handler, game_db_snapshot=game_db_snapshot)  # type: ignore
+        bot.kill_tracker = KillTracker(bot=bot, channel_id=KILLS_CHANNEL_ID, game_db_snapshot=game_db_snapshot)  # type: ignore
         bot.player_sync = PlayerSync(bot, LOG_FILE_PATH, ftp_handler=ftp_handler)  # type: ignore
         bot.vote_tracker = VoteTracker(bot, TOP_SERVER_CHANNEL_ID, SERVER_PRIVE_CHANNEL_ID, ftp_handler=ftp_handler)  # type: ignore
         bot.item_manager = ItemManager(bot, ftp_handler=ftp_handler)  # type: ignore
+        bot.delivery_worker = DeliveryWorker(bot)  # type: ignore
+        bot.shop_catalog = ShopCatalog()  # type: ignore
 
         # Démarrage des trackers
         await bot.player_tracker.start()  # type: ignore
@@ -77,6 +86,8 @@ async def on_ready():
         await bot.kill_tracker.start()  # type: ignore
         await bot.player_sync.start()  # type: ignore
         await bot.vote_tracker.start()  # type: ignore
+        await bot.delivery_worker.start()  # type: ignore
+        await bot.shop_catalog.load()  # type: ignore
         
         print("Tous les trackers sont démarrés avec succès!")
         
@@ -98,4 +109,8 @@ async def load_all_cogs(bot):
                 traceback.print_exc()
 
 # Lancer le bot
-bot.run(DISCORD_TOKEN) 
\ No newline at end of file
+try:
+    bot.run(DISCORD_TOKEN)
+finally:
+    # Supprimer les copies locales de game.db
+    game_db_snapshot.close() 
\ No newline at end of file
@@ -1,90 +1,78 @@
 import discord
 from discord.ext import commands
-import sqlite3
 from config.logging_config import log_buy_command, log_error
 
-DB_PATH = 'discord.db'
-
 class Buy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
     @commands.command()
-    async def buy(self, ctx, id_item_shop: int = None):
+    async def buy(self, ctx, *ids_item_shop: int):
         """
-        Permet d'acheter un item via son id_item_shop. Utilisable uniquement en DM avec le bot.
+        Permet d'acheter un ou plusieurs items via leur id_item_shop (ex : !buy 10 11 12). Utilisable uniquement en DM avec le bot.
         """
         # Vérifier que la commande est en DM
         if not isinstance(ctx.channel, discord.DMChannel):
             await ctx.send("❌ Cette commande ne peut être utilisée qu'en message privé avec le bot.")
             return
 
-        if id_item_shop is None:
-            await ctx.send("❌ Merci de préciser l'ID de l'item à acheter. Exemple : !buy 101")
+        if not ids_item_shop:
+            await ctx.send("❌ Merci de préciser l'ID de l'item à acheter. Exemple : !buy 101 (ou plusieurs : !buy 101 102)")
             return
 
-        # Récupérer l'item dans la base de données
+        # Récupérer les items du panier dans le catalogue en mémoire
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, item_id, count, price FROM items WHERE id_item_shop = ? AND enabled = 1", (id_item_shop,))
-            row = cursor.fetchone()
-            if not row:
-                conn.close()
-                await ctx.send(f"❌ Aucun item trouvé avec l'ID boutique {id_item_shop}.")
-                return
-            item_name, item_id, count, price = row
+            cart = []
+            for id_item_shop in ids_item_shop:
+                item = await self.bot.shop_catalog.get(id_item_shop)
+                if not item:
+                    await ctx.send(f"❌ Aucun item trouvé avec l'ID boutique {id_item_shop}.")
+                    return
+                cart.append((item.name, item.item_id, item.count, item.price))
+            total_price = sum(price for _, _, _, price in cart)
 
             # Récupérer le wallet du joueur
             discord_id = str(ctx.author.id)
-            cursor.execute("SELECT wallet FROM users WHERE discord_id = ?", (discord_id,))
-            wallet_row = cursor.fetchone()
-            if not wallet_row:
-                conn.close()
+            delivery_worker = self.bot.delivery_worker
+            wallet = await delivery_worker.db.wallet.get_balance_async(discord_id)
+            if wallet is None:
                 await ctx.send("❌ Vous n'êtes pas encore enregistré. Utilisez la commande !register pour vous inscrire.")
                 return
-            wallet = wallet_row[0] or 0
 
-            if wallet < price:
-                conn.close()
-                await ctx.send(f"❌ Solde insuffisant. Il vous faut {price} coins pour acheter cet item. Votre solde actuel : {wallet} coins.")
+            if wallet < total_price:
+                await ctx.send(f"❌ Solde insuffisant. Il vous faut {total_price} coins pour cet achat. Votre solde actuel : {wallet} coins.")
                 return
 
             # Vérifier la présence en ligne comme pour le starterpack
             item_manager = self.bot.item_manager
-            steam_id = item_manager.get_player_steamid(discord_id)
+            steam_id = await item_manager.get_player_steamid_async(discord_id)
             if not steam_id:
-                conn.close()
                 await ctx.send("❌ Vous n'êtes pas encore enregistré. Utilisez la commande !register pour vous inscrire.")
                 return
-            if not item_manager.is_player_online(steam_id):
-                conn.close()
+            if not await item_manager.is_player_online(steam_id):
                 await ctx.send("❌ Vous devez être connecté au serveur pour acheter cet item.")
                 return
 
-            # Give l'item
-            success, error_msg = await item_manager.give_item_to_player(discord_id, item_id, count)
-            if success:
-                # Mettre à jour le wallet
-                new_wallet = wallet - price
-                cursor.execute("UPDATE users SET wallet = ? WHERE discord_id = ?", (new_wallet, discord_id))
-                conn.commit()
-                conn.close()
-                
-                # 📝 LOG DE L'ACHAT RÉUSSI
+            # Débit et mise en file de livraison dans la même transaction : l'achat survit
+            # à un redémarrage du bot et l'id du message évite un double débit
+            queued, new_wallet = await delivery_worker.db.enqueue_purchase_async(str(ctx.message.id), discord_id, steam_id, cart)
+            if queued is None:
+                await ctx.send("ℹ️ Cette commande a déjà été prise en compte.")
+                return
+            if not queued:
+                await ctx.send(f"❌ Solde insuffisant. Il vous faut {total_price} coins pour cet achat. Votre solde actuel : {new_wallet} coins.")
+                return
+            delivery_worker.notify()
+
+            # 📝 LOG DE L'ACHAT
+            for item_name, _, count, price in cart:
                 log_buy_command(ctx.author.display_name, item_name, count, price)
-                
-                await ctx.send(f"✅ L'item **{item_name}** (x{count}) t'a été donné avec succès ! Nouveau solde : {new_wallet} coins.")
-            else:
-                conn.close()
-                
-                # 📝 LOG DE L'ERREUR DE GIVE
-                log_error("BUY_GIVE", f"Échec give pour {ctx.author.display_name} - Item: {item_name} (x{count}) - Erreur: {error_msg}")
-                
-                await ctx.send(f"❌ Impossible de donner l'item **{item_name}**. {error_msg if error_msg else ''}")
+
+            ordered = ", ".join(f"**{item_name}** (x{count})" for item_name, _, count, _ in cart)
+            await ctx.send(f"🛒 Achat enregistré : {ordered}. Livraison en cours, tu recevras un message de confirmation. Nouveau solde : {new_wallet} coins.")
         except Exception as e:
             # 📝 LOG DE L'ERREUR GÉNÉRALE
-            log_error("BUY_COMMAND", f"Erreur commande !buy pour {ctx.author.display_name} - ID: {id_item_shop} - Erreur: {str(e)}")
+            log_error("BUY_COMMAND", f"Erreur commande !buy pour {ctx.author.display_name} - ID: {' '.join(map(str, ids_item_shop))} - Erreur: {str(e)}")
             
             await ctx.send(f"❌ Erreur lors de l'achat : {e}")
 
@@ -9,7 +9,7 @@ class Rcon(commands.Cog):
         """Vérifie la connexion RCON"""
         if ctx.author.guild_permissions.administrator:
             try:
-                response = self.bot.rcon_client.execute("version")
+                response = await self.bot.rcon_client.execute("version")
                 if response:
                     await ctx.send(f"✅ Connexion RCON OK\nRéponse: {response}")
                 else:
@@ -15,7 +15,7 @@ class Register(commands.Cog):
                 return
 
             # Vérifier si l'utilisateur est déjà enregistré
-            info = self.bot.player_sync.db.get_player_info(str(ctx.author.id))
+            info = await self.bot.player_sync.db.get_player_info_async(str(ctx.author.id))
             if info and info[1]:  # Si player_name existe
                 await ctx.send("❌ Votre compte est déjà enregistré !")
                 return
@@ -1,11 +1,9 @@
 import os
 import discord
 from discord.ext import commands
-import sqlite3
 
 SHOP_CHANNEL_ID = int(os.getenv('SHOP_CHANNEL_ID', 1379725647579975730))
 COMMANDE_CHANNEL_ID = int(os.getenv('COMMANDE_CHANNEL_ID', 1375046216097988629))
-DB_PATH = 'discord.db'
 
 CATEGORY_STYLES = {
     "Outils":     {"color": 0x3498DB, "icon": "https://cdn-icons-png.flaticon.com/128/7213/7213807.png"},  # Bleu
@@ -68,28 +66,14 @@ class Shop(commands.Cog):
         except Exception as e:
             print(f"Erreur lors de la suppression des anciens messages : {e}")
 
-        # Lire les items depuis la base de données
+        # Items du catalogue en mémoire, déjà groupés par catégorie
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, id_item_shop, count, price, category FROM items WHERE enabled = 1 ORDER BY category, name")
-            items = cursor.fetchall()
-            conn.close()
+            catalog = await self.bot.shop_catalog.by_category()
         except Exception as e:
             await ctx.send(f"❌ Erreur lors de la lecture de la base de données: {e}")
             return
 
-        # Organiser les items par catégorie
-        shop_dict = {}
-        for name, id_item_shop, count, price, category in items:
-            if category not in shop_dict:
-                shop_dict[category] = []
-            shop_dict[category].append({
-                'name': name,
-                'id_item_shop': id_item_shop,
-                'count': count,
-                'price': price
-            })
+        shop_dict = {category: [item._asdict() for item in items] for category, items in catalog.items()}
 
         # Envoyer un embed par catégorie dans l'ordre défini
         for category in CATEGORY_ORDER:
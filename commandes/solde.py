@@ -1,10 +1,12 @@
 from discord.ext import commands
 import discord
-import sqlite3
+from database.connection import fetch_one_async
+from database.database_wallet import DatabaseWallet
 
 class Solde(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.wallet = DatabaseWallet()
 
     @commands.command(name="solde")
     async def solde_command(self, ctx):
@@ -15,16 +17,12 @@ class Solde(commands.Cog):
             return
 
         try:
-            # Récupérer les informations du joueur
-            conn = sqlite3.connect('discord.db')
-            c = conn.cursor()
-            
-            # Rechercher le joueur dans la base de données
-            c.execute('SELECT player_name, wallet FROM users WHERE discord_id = ?', (str(ctx.author.id),))
-            result = c.fetchone()
+            # Solde lu depuis le cache du wallet (requête seulement au premier appel)
+            wallet = await self.wallet.get_balance_async(str(ctx.author.id))
+            result = await fetch_one_async('SELECT player_name FROM users WHERE discord_id = ?', (str(ctx.author.id),)) if wallet is not None else None
             
             if result:
-                player_name, wallet = result
+                player_name = result[0]
                 await ctx.send(f"💰 **Votre solde actuel**\n"
                              f"Personnage : {player_name}\n"
                              f"Portefeuille : {wallet} points")
@@ -33,8 +31,6 @@ class Solde(commands.Cog):
                 
         except Exception as e:
             await ctx.send("❌ Une erreur est survenue lors de la récupération de votre solde.")
-        finally:
-            conn.close()
 
 async def setup(bot):
     await bot.add_cog(Solde(bot)) 
\ No newline at end of file
@@ -0,0 +1,133 @@
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+DB_PATH = 'discord.db'
+
+# Attente maximale (ms) quand un autre thread ou processus écrit dans la base
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))
+# Nombre de requêtes préparées gardées en cache par connexion
+CACHED_STATEMENTS = 256
+
+# Connexions du thread courant : {chemin: connexion}
+_local = threading.local()
+
+# Accès asynchrones : un seul thread d'écriture (écritures sérialisées, jamais de "database is locked"
+# entre elles) et quelques threads de lecture (WAL : les lectures ne sont pas bloquées par l'écriture)
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='discord-db-writer')
+_readers = ThreadPoolExecutor(max_workers=int(os.getenv('DB_READER_THREADS', '2')), thread_name_prefix='discord-db-reader')
+
+
+def get_connection(path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Retourne la connexion du thread courant à la base (créée au premier appel puis réutilisée).
+    La connexion est en mode autocommit : chaque requête isolée est validée immédiatement,
+    les écritures en plusieurs étapes passent par transaction().
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                               cached_statements=CACHED_STATEMENTS)
+        # WAL : les lectures ne bloquent plus les écritures (et inversement)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        connections[path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(path: str = DB_PATH):
+    """
+    Ouvre une transaction d'écriture (BEGIN IMMEDIATE) validée à la sortie du bloc,
+    annulée si une exception est levée. Un bloc imbriqué participe à la transaction englobante.
+    Ne pas utiliser await dans le bloc : la connexion est partagée par toutes les coroutines du thread.
+    """
+    conn = get_connection(path)
+    if conn.in_transaction:
+        yield conn
+        return
+    callbacks = _commit_callbacks(path)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+        conn.execute('COMMIT')
+    except BaseException:
+        callbacks.clear()
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    pending = list(callbacks)
+    callbacks.clear()
+    for callback in pending:
+        callback()
+
+
+def _commit_callbacks(path: str) -> list:
+    commit_callbacks = getattr(_local, 'commit_callbacks', None)
+    if commit_callbacks is None:
+        commit_callbacks = _local.commit_callbacks = {}
+    return commit_callbacks.setdefault(path, [])
+
+
+def on_commit(callback, path: str = DB_PATH):
+    """
+    Appelle callback() une fois la transaction en cours validée (jamais si elle est annulée),
+    ou immédiatement hors transaction. Sert à tenir à jour les caches en mémoire.
+    """
+    if get_connection(path).in_transaction:
+        _commit_callbacks(path).append(callback)
+    else:
+        callback()
+
+
+def close_connections():
+    """Ferme les connexions ouvertes par le thread courant"""
+    connections = getattr(_local, 'connections', None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+async def run_write(func, *args, **kwargs):
+    """Exécute func(*args, **kwargs) sur le thread d'écriture, sans bloquer la boucle asyncio"""
+    return await asyncio.get_running_loop().run_in_executor(_writer, functools.partial(func, *args, **kwargs))
+
+
+async def run_read(func, *args, **kwargs):
+    """Exécute func(*args, **kwargs) sur un thread de lecture, sans bloquer la boucle asyncio"""
+    return await asyncio.get_running_loop().run_in_executor(_readers, functools.partial(func, *args, **kwargs))
+
+
+def fetch_one(sql: str, params=(), path: str = DB_PATH):
+    """Exécute une requête de lecture et retourne la première ligne (None si aucune)"""
+    return get_connection(path).execute(sql, params).fetchone()
+
+
+def fetch_all(sql: str, params=(), path: str = DB_PATH):
+    """Exécute une requête de lecture et retourne toutes les lignes"""
+    return get_connection(path).execute(sql, params).fetchall()
+
+
+def execute(sql: str, params=(), path: str = DB_PATH) -> int:
+    """Exécute une requête d'écriture isolée et retourne le nombre de lignes modifiées"""
+    return get_connection(path).execute(sql, params).rowcount
+
+
+async def fetch_one_async(sql: str, params=(), path: str = DB_PATH):
+    return await run_read(fetch_one, sql, params, path)
+
+
+async def fetch_all_async(sql: str, params=(), path: str = DB_PATH):
+    return await run_read(fetch_all, sql, params, path)
+
+
+async def execute_async(sql: str, params=(), path: str = DB_PATH) -> int:
+    return await run_write(execute, sql, params, path)
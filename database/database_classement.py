@@ -4,6 +4,9 @@ from config.logging_config import setup_logging
 import time
 import os
 from dotenv import load_dotenv
+from utils.dedup_cache import BoundedDedupCache, compact_key
+from database.connection import get_connection, transaction, run_read, run_write
+from database.migrations import run_migrations
 
 load_dotenv()
 
@@ -16,84 +19,133 @@ class DatabaseClassement:
         self.game_db_path = os.getenv('FTP_GAME_DB', 'ConanSandbox/Saved/game.db')
         self._initialize_db()
         self.last_check_time = 0
-        self.processed_kills = set()  # Cache des kills déjà traités
+        # Kills déjà comptés (fenêtre glissante, sauvegardée dans la table processed_kills)
+        self.processed_kills = BoundedDedupCache(maxlen=10000, ttl=float(os.getenv('PROCESSED_KILLS_TTL', '3600')))
+        self._load_processed_kills()
+        self.last_generation = None  # Dernière génération de game.db analysée
+        # Dernier lastTimeOnline traité (horloge du serveur de jeu), conservé entre les redémarrages
+        self.kill_watermark = self._get_state('kills_watermark', int)
         logger.info(f"DatabaseClassement initialisé avec game_db_path: {self.game_db_path}")
 
     def _initialize_db(self):
-        """Initialise la table de classement si elle n'existe pas"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS classement (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_name TEXT NOT NULL,
-                original_name TEXT NOT NULL,
-                kills INTEGER DEFAULT 0,
-                last_kill TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(player_name)
-            )
-        ''')
-        conn.commit()
-        conn.close()
-
-    def check_kills(self, ftp_handler):
+        """Met le schéma de la base à jour (tables classement, processed_kills et bot_state)"""
+        run_migrations(self.db_path)
+
+    def _load_processed_kills(self):
+        """Recharge les kills traités encore dans la fenêtre de déduplication et purge les plus anciens"""
+        try:
+            conn = get_connection(self.db_path)
+            limit = time.time() - self.processed_kills.ttl
+            conn.execute('DELETE FROM processed_kills WHERE seen_at < ?', (limit,))
+            c = conn.execute('SELECT kill_key, seen_at FROM processed_kills ORDER BY seen_at')
+            for kill_key, seen_at in c.fetchall():
+                self.processed_kills.add(kill_key, seen_at)
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des kills traités: {e}")
+
+    def _get_state(self, key, cast=str):
+        """Lit une valeur de bot_state (None si absente)"""
+        try:
+            c = get_connection(self.db_path).execute('SELECT value FROM bot_state WHERE key = ?', (key,))
+            row = c.fetchone()
+            return cast(row[0]) if row and row[0] is not None else None
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de {key}: {e}")
+            return None
+
+    def _set_state(self, key, value):
+        """Enregistre une valeur dans bot_state"""
+        try:
+            get_connection(self.db_path).execute('INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)', (key, str(value)))
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement de {key}: {e}")
+
+    def prepare_snapshot(self, path):
+        """
+        Crée sur chaque nouvelle copie locale de game.db les index utilisés par check_kills
+        (appelé par GameDBSnapshot avant la publication de la copie, qui est ensuite en lecture seule)
+        """
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS bot_idx_dead_characters
+                ON characters (lastTimeOnline)
+                WHERE isAlive = 0 AND killerName IS NOT NULL
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS bot_idx_characters_name ON characters (char_name)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def check_kills(self, game_db_snapshot):
         """Vérifie les kills dans la base de données du jeu et retourne True si de nouveaux kills sont détectés"""
         try:
-            # Lire la base de données du jeu
-            db_data = ftp_handler.read_database(self.game_db_path)
-            if db_data is None:
+            # Génération courante de game.db (rafraîchie par l'appelant via refresh_async)
+            handle = game_db_snapshot.acquire(refresh=False)
+            if handle is None:
                 logger.error("Impossible de lire la base de données du jeu")
                 return False
 
-            # Créer un fichier temporaire pour la base de données
-            temp_path = self._load_db_from_bytes(db_data)
-            conn = sqlite3.connect(temp_path)
-            c = conn.cursor()
+            with handle:
+                # Même génération que lors du dernier passage : aucun nouveau kill possible
+                if handle.generation == self.last_generation:
+                    return False
 
-            # Récupérer SEULEMENT les morts récentes (plus efficace)
-            # On utilise lastTimeOnline pour filtrer les morts récentes
-            current_time = int(time.time())
-            time_threshold = current_time - 300  # 5 minutes en arrière pour être sûr
+                conn = handle.connect()
+                c = conn.cursor()
 
-            c.execute('''
-                SELECT c1.char_name as victim, 
-                       c1.killerName as killer, 
-                       c1.lastTimeOnline as death_time,
-                       c2.char_name as killer_confirmed
-                FROM characters c1
-                INNER JOIN characters c2 ON c1.killerName = c2.char_name
-                WHERE c1.isAlive = 0 
-                AND c1.killerName IS NOT NULL
-                AND c1.killerName != c1.char_name  -- Évite les suicides
-                AND c1.lastTimeOnline > ?  -- Seulement les morts récentes
-                ORDER BY c1.lastTimeOnline DESC
-            ''', (time_threshold,))
-            
-            recent_kills = c.fetchall()
-            conn.close()
-            os.remove(temp_path)
+                # Ne lire que les morts postérieures au dernier kill traité (index bot_idx_dead_characters)
+                watermark = self.kill_watermark
+                if watermark is None:
+                    # Premier démarrage : partir des 5 dernières minutes, sur l'horloge du serveur de jeu
+                    c.execute('SELECT MAX(lastTimeOnline) FROM characters WHERE isAlive = 0 AND killerName IS NOT NULL')
+                    latest = c.fetchone()[0]
+                    watermark = int(latest) - 300 if latest is not None else 0
 
-            new_kills_detected = False
-            
-            # Traiter uniquement les nouveaux kills
-            for victim_name, killer_name, death_time, killer_confirmed in recent_kills:
-                # Créer un identifiant unique pour ce kill
-                kill_id = f"{killer_name}_{victim_name}_{death_time}"
+                c.execute('''
+                    SELECT c1.char_name as victim, 
+                           c1.killerName as killer, 
+                           c1.lastTimeOnline as death_time,
+                           c2.char_name as killer_confirmed
+                    FROM characters c1
+                    INNER JOIN characters c2 ON c1.killerName = c2.char_name
+                    WHERE c1.isAlive = 0 
+                    AND c1.killerName IS NOT NULL
+                    AND c1.killerName != c1.char_name  -- Évite les suicides
+                    AND c1.lastTimeOnline >= ?  -- Seulement les morts depuis le dernier passage
+                    ORDER BY c1.lastTimeOnline ASC
+                ''', (watermark,))
                 
-                # Vérifier si ce kill a déjà été traité
-                if kill_id not in self.processed_kills:
-                    # Nouveau kill détecté
-                    if self.update_kill_stats(killer_name, death_time):
-                        self.processed_kills.add(kill_id)
-                        new_kills_detected = True
-                        logger.info(f"Nouveau kill détecté: {killer_name} a tué {victim_name}")
-            
-            # Nettoyer le cache des kills traités (garder seulement les 1000 derniers)
-            if len(self.processed_kills) > 1000:
-                # Convertir en liste, garder les 500 derniers
-                kills_list = list(self.processed_kills)
-                self.processed_kills = set(kills_list[-500:])
+                recent_kills = c.fetchall()
+                self.last_generation = handle.generation
+
+            # Garder uniquement les kills pas encore traités
+            new_kills = []
+            for victim_name, killer_name, death_time, killer_confirmed in recent_kills:
+                # Identifiant compact et unique pour ce kill
+                kill_key = compact_key(killer_name, victim_name, death_time)
+                if kill_key not in self.processed_kills:
+                    new_kills.append((killer_name, death_time, kill_key))
+                    logger.info(f"Nouveau kill détecté: {killer_name} a tué {victim_name}")
+
+            new_kills_detected = False
+            if new_kills:
+                # Tous les kills du passage enregistrés en une seule transaction
+                updated = self.update_kill_stats_batch(new_kills)
+                if updated is None:
+                    # Rien n'a été enregistré : le passage sera retenté sur la même plage
+                    self.last_generation = None
+                    return False
+                for _, _, kill_key in new_kills:
+                    self.processed_kills.add(kill_key)
+                new_kills_detected = updated > 0
+            new_watermark = max([watermark] + [int(death_time) for _, _, death_time, _ in recent_kills])
+
+            # Les kills à l'instant exact du watermark sont relus au prochain passage
+            # et écartés par processed_kills
+            if new_watermark != self.kill_watermark:
+                self.kill_watermark = new_watermark
+                self._set_state('kills_watermark', new_watermark)
             
             return new_kills_detected
 
@@ -103,59 +155,62 @@ class DatabaseClassement:
             logger.error(traceback.format_exc())
             return False
 
-    def update_kill_stats(self, killer_name: str, kill_time: int):
-        """Met à jour les statistiques de kills dans la base de données"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        try:
-            # Normaliser le nom pour éviter les doublons (minuscules, espaces supprimés)
+    def update_kill_stats(self, killer_name: str, kill_time: int, kill_key: int = None):
+        """
+        Met à jour les statistiques de kills dans la base de données.
+        Avec kill_key, le kill est marqué comme traité dans la même transaction.
+        """
+        return bool(self.update_kill_stats_batch([(killer_name, kill_time, kill_key)]))
+
+    def update_kill_stats_batch(self, kills):
+        """
+        Enregistre un lot de kills [(killer_name, kill_time, kill_key)] en une seule transaction.
+        Les kills d'un même tueur sont regroupés ; un tueur n'est mis à jour que si son kill le plus
+        récent est postérieur à last_kill (garde faite en SQL).
+        Retourne le nombre de tueurs mis à jour, ou None en cas d'erreur (rien n'est enregistré).
+        """
+        # Regrouper par nom normalisé (minuscules, espaces supprimés) : nombre de kills et kill le plus récent
+        per_killer = {}
+        for killer_name, kill_time, _ in kills:
             norm_name = killer_name.strip().lower()
             original_name = killer_name.strip()  # Garder le nom original pour l'affichage
-            
-            # Vérifier si le joueur existe déjà
-            c.execute('SELECT kills, last_kill FROM classement WHERE player_name = ?', (norm_name,))
-            result = c.fetchone()
-            
-            if result:
-                current_kills, last_kill = result
-                # Vérifier si ce kill est plus récent que le dernier enregistré
-                if last_kill is None or int(kill_time) > int(last_kill):
-                    # Mise à jour : incrémenter kills et mettre à jour last_kill
-                    c.execute('''
-                        UPDATE classement 
-                        SET kills = kills + 1, 
-                            last_kill = ?, 
-                            original_name = ?
-                        WHERE player_name = ?
-                    ''', (kill_time, original_name, norm_name))
-                    conn.commit()
-                    logger.info(f"Kill mis à jour pour {killer_name}: {current_kills + 1} kills")
-                    return True
-                else:
-                    # Kill déjà comptabilisé ou plus ancien
-                    return False
-            else:
-                # Nouveau joueur : insertion
-                c.execute('''
-                    INSERT INTO classement (player_name, original_name, kills, last_kill) 
+            count, last_kill, _ = per_killer.get(norm_name, (0, None, None))
+            last_kill = int(kill_time) if last_kill is None else max(last_kill, int(kill_time))
+            per_killer[norm_name] = (count + 1, last_kill, original_name)
+
+        try:
+            with transaction(self.db_path) as conn:
+                c = conn.executemany('''
+                    INSERT INTO classement (player_name, original_name, kills, last_kill)
                     VALUES (?, ?, ?, ?)
-                ''', (norm_name, original_name, 1, kill_time))
-                conn.commit()
-                logger.info(f"Nouveau joueur ajouté: {killer_name} avec 1 kill")
-                return True
-                
+                    ON CONFLICT(player_name) DO UPDATE SET
+                        kills = classement.kills + excluded.kills,
+                        last_kill = excluded.last_kill,
+                        original_name = excluded.original_name
+                    WHERE classement.last_kill IS NULL OR excluded.last_kill > classement.last_kill
+                ''', [(norm_name, original_name, count, last_kill)
+                      for norm_name, (count, last_kill, original_name) in per_killer.items()])
+                updated = c.rowcount
+                self._mark_processed(conn, [kill_key for _, _, kill_key in kills if kill_key is not None])
+            logger.info(f"{len(kills)} kill(s) enregistré(s) pour {updated} joueur(s)")
+            return updated
         except Exception as e:
             logger.error(f"Erreur lors de la mise à jour des stats: {e}")
-            conn.rollback()
-            return False
-        finally:
-            conn.close()
+            return None
+
+    def _mark_processed(self, conn, kill_keys):
+        """Enregistre des kills traités (dans la transaction en cours)"""
+        if kill_keys:
+            now = time.time()
+            conn.executemany('INSERT OR REPLACE INTO processed_kills (kill_key, seen_at) VALUES (?, ?)',
+                             [(kill_key, now) for kill_key in kill_keys])
+            # La table reste petite : seuls les kills de la fenêtre de déduplication sont gardés
+            conn.execute('DELETE FROM processed_kills WHERE seen_at < ?', (now - self.processed_kills.ttl,))
 
     def get_kill_stats(self):
         """Récupère les TOP 30 statistiques de kills triées par nombre de kills"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
         try:
+            c = get_connection(self.db_path).cursor()
             # Récupérer les 30 meilleurs avec le nom original pour l'affichage
             c.execute('''
                 SELECT original_name, kills
@@ -171,27 +226,28 @@ class DatabaseClassement:
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des stats: {e}")
             return []
-        finally:
-            conn.close()
 
     def get_total_players_count(self):
         """Récupère le nombre total de joueurs dans le classement"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
         try:
-            c.execute('SELECT COUNT(*) FROM classement WHERE kills > 0')
+            c = get_connection(self.db_path).execute('SELECT COUNT(*) FROM classement WHERE kills > 0')
             count = c.fetchone()[0]
             return count
         except Exception as e:
             logger.error(f"Erreur lors du comptage des joueurs: {e}")
             return 0
-        finally:
-            conn.close()
 
-    def _load_db_from_bytes(self, db_data):
-        """Crée un fichier temporaire avec les données de la base de données"""
-        import tempfile
-        temp = tempfile.NamedTemporaryFile(delete=False)
-        temp.write(db_data)
-        temp.close()
-        return temp.name
+    # Versions asynchrones : la requête s'exécute hors de la boucle asyncio
+    # (écritures sur le thread d'écriture unique, lectures sur les threads de lecture)
+
+    async def check_kills_async(self, game_db_snapshot):
+        return await run_write(self.check_kills, game_db_snapshot)
+
+    async def update_kill_stats_batch_async(self, kills):
+        return await run_write(self.update_kill_stats_batch, kills)
+
+    async def get_kill_stats_async(self):
+        return await run_read(self.get_kill_stats)
+
+    async def get_total_players_count_async(self):
+        return await run_read(self.get_total_players_count)
@@ -0,0 +1,152 @@
+import time
+from config.logging_config import setup_logging
+from database.connection import get_connection, transaction, run_write
+from database.migrations import run_migrations
+from database.database_wallet import DatabaseWallet, apply_delta
+
+logger = setup_logging()
+
+# États d'une livraison
+STATUS_PENDING = 'pending'          # En attente (ou en attente d'une nouvelle tentative)
+STATUS_IN_PROGRESS = 'in_progress'  # Prise en charge par le worker
+STATUS_DELIVERED = 'delivered'
+STATUS_REFUNDED = 'refunded'        # Abandonnée après plusieurs échecs, joueur remboursé
+
+
+class DatabaseDelivery:
+    def __init__(self):
+        """Initialise la file de livraison des achats de la boutique"""
+        self.db_path = 'discord.db'
+        self.wallet = DatabaseWallet()
+        self._initialize_db()
+
+    def _initialize_db(self):
+        """Met le schéma de la base à jour (table delivery_queue)"""
+        run_migrations(self.db_path)
+
+    def enqueue_purchase(self, order_key: str, discord_id: str, steam_id: str, cart):
+        """
+        Débite le wallet et enregistre les livraisons du panier dans la même transaction.
+        - order_key : identifiant unique de la commande (id du message Discord)
+        - cart : liste de (item_name, item_id, count, price)
+        Retourne (True, nouveau solde), (False, solde actuel) si le solde est insuffisant,
+        ou (None, solde actuel) si la commande a déjà été enregistrée.
+        """
+        total_price = sum(price for _, _, _, price in cart)
+        try:
+            with transaction(self.db_path) as conn:
+                c = conn.cursor()
+                c.execute('SELECT 1 FROM delivery_queue WHERE order_key = ? LIMIT 1', (order_key,))
+                already_queued = c.fetchone() is not None
+                if not already_queued:
+                    # Débit atomique inscrit au ledger : échoue si le solde a changé entre-temps
+                    debited = apply_delta(discord_id, -total_price, 'achat', f"order:{order_key}", path=self.db_path) is not None
+                    if debited:
+                        c.executemany('''
+                            INSERT INTO delivery_queue (idempotency_key, order_key, discord_id, steam_id, item_name, item_id, count, price)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', [(f"{order_key}:{index}", order_key, discord_id, steam_id, item_name, item_id, count, price)
+                              for index, (item_name, item_id, count, price) in enumerate(cart)])
+                c.execute('SELECT wallet FROM users WHERE discord_id = ?', (discord_id,))
+                row = c.fetchone()
+            wallet = (row[0] or 0) if row else 0
+            if already_queued:
+                return None, wallet
+            return debited, wallet
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement de la commande {order_key}: {e}")
+            raise
+
+    def recover_in_progress(self):
+        """Remet en file les livraisons interrompues (arrêt du bot pendant une livraison)"""
+        try:
+            c = get_connection(self.db_path).execute(
+                'UPDATE delivery_queue SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE status = ?',
+                (STATUS_PENDING, STATUS_IN_PROGRESS))
+            if c.rowcount:
+                logger.warning(f"{c.rowcount} livraison(s) interrompue(s) remise(s) en file")
+            return c.rowcount
+        except Exception as e:
+            logger.error(f"Erreur lors de la reprise des livraisons: {e}")
+            return 0
+
+    def claim_due(self, limit: int = 50):
+        """Réserve les livraisons dues et les retourne (id, discord_id, steam_id, item_name, item_id, count, price, attempts)"""
+        try:
+            with transaction(self.db_path) as conn:
+                c = conn.cursor()
+                c.execute('''
+                    SELECT id, discord_id, steam_id, item_name, item_id, count, price, attempts
+                    FROM delivery_queue
+                    WHERE status = ? AND next_attempt_at <= ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (STATUS_PENDING, time.time(), limit))
+                rows = c.fetchall()
+                c.executemany('UPDATE delivery_queue SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                              [(STATUS_IN_PROGRESS, row[0]) for row in rows])
+            return rows
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de la file de livraison: {e}")
+            return []
+
+    def mark_delivered(self, delivery_id: int):
+        """Marque une livraison comme effectuée"""
+        try:
+            get_connection(self.db_path).execute('''
+                UPDATE delivery_queue
+                SET status = ?, attempts = attempts + 1, last_error = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (STATUS_DELIVERED, delivery_id))
+        except Exception as e:
+            logger.error(f"Erreur lors de la validation de la livraison {delivery_id}: {e}")
+
+    def schedule_retry(self, delivery_id: int, error: str, delay: float):
+        """Remet une livraison en file pour une nouvelle tentative dans delay secondes"""
+        try:
+            get_connection(self.db_path).execute('''
+                UPDATE delivery_queue
+                SET status = ?, attempts = attempts + 1, last_error = ?, next_attempt_at = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (STATUS_PENDING, error, time.time() + delay, delivery_id))
+        except Exception as e:
+            logger.error(f"Erreur lors de la replanification de la livraison {delivery_id}: {e}")
+
+    def refund(self, delivery_id: int, error: str):
+        """Abandonne une livraison et rembourse le joueur (une seule fois)"""
+        try:
+            with transaction(self.db_path) as conn:
+                c = conn.cursor()
+                c.execute('''
+                    UPDATE delivery_queue
+                    SET status = ?, attempts = attempts + 1, last_error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = ?
+                ''', (STATUS_REFUNDED, error, delivery_id, STATUS_IN_PROGRESS))
+                if c.rowcount:
+                    c.execute('SELECT discord_id, price FROM delivery_queue WHERE id = ?', (delivery_id,))
+                    discord_id, price = c.fetchone()
+                    apply_delta(discord_id, price or 0, 'remboursement', f"refund:{delivery_id}", path=self.db_path)
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors du remboursement de la livraison {delivery_id}: {e}")
+            return False
+
+    # Versions asynchrones, exécutées sur le thread d'écriture unique
+
+    async def enqueue_purchase_async(self, order_key: str, discord_id: str, steam_id: str, cart):
+        return await run_write(self.enqueue_purchase, order_key, discord_id, steam_id, cart)
+
+    async def recover_in_progress_async(self):
+        return await run_write(self.recover_in_progress)
+
+    async def claim_due_async(self, limit: int = 50):
+        return await run_write(self.claim_due, limit)
+
+    async def mark_delivered_async(self, delivery_id: int):
+        return await run_write(self.mark_delivered, delivery_id)
+
+    async def schedule_retry_async(self, delivery_id: int, error: str, delay: float):
+        return await run_write(self.schedule_retry, delivery_id, error, delay)
+
+    async def refund_async(self, delivery_id: int, error: str):
+        return await run_write(self.refund, delivery_id, error)
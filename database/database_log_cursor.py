@@ -0,0 +1,45 @@
+from config.logging_config import setup_logging
+from database.connection import get_connection, run_write
+from database.migrations import run_migrations
+
+logger = setup_logging()
+
+
+class DatabaseLogCursor:
+    def __init__(self):
+        """Initialise le stockage des positions de lecture des logs distants"""
+        self.db_path = 'discord.db'
+        self._initialize_db()
+
+    def _initialize_db(self):
+        """Met le schéma de la base à jour (table log_cursor)"""
+        run_migrations(self.db_path)
+
+    def get_cursor(self, path: str):
+        """Retourne (offset, last_line_ts, size, head_hash) pour un log, ou None si aucun point de reprise"""
+        try:
+            c = get_connection(self.db_path).execute('SELECT byte_offset, last_line_ts, size, head_hash FROM log_cursor WHERE path = ?', (path,))
+            return c.fetchone()
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture du point de reprise de {path}: {e}")
+            return None
+
+    def save_cursor(self, path: str, offset: int, last_line_ts: str, size: int, head_hash: str):
+        """Enregistre la position de lecture d'un log"""
+        try:
+            get_connection(self.db_path).execute('''
+                INSERT INTO log_cursor (path, byte_offset, last_line_ts, size, head_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(path) DO UPDATE SET
+                    byte_offset = excluded.byte_offset,
+                    last_line_ts = excluded.last_line_ts,
+                    size = excluded.size,
+                    head_hash = excluded.head_hash,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (path, offset, last_line_ts, size, head_hash))
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement du point de reprise de {path}: {e}")
+
+    async def save_cursor_async(self, path: str, offset: int, last_line_ts: str, size: int, head_hash: str):
+        """Version asynchrone de save_cursor (écriture sur le thread d'écriture unique)"""
+        return await run_write(self.save_cursor, path, offset, last_line_ts, size, head_hash)
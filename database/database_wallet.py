@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from config.logging_config import setup_logging
+from database.connection import DB_PATH, get_connection, transaction, on_commit, run_read, run_write
+from database.migrations import run_migrations
+
+logger = setup_logging()
+
+# Soldes connus (discord_id -> (wallet, instant de lecture)), partagés par toutes les instances.
+# Mis à jour après chaque mouvement validé : le ledger et users.wallet restent la référence.
+# Une entrée n'est servie que pendant WALLET_CACHE_TTL secondes, pour voir aussi les
+# modifications faites directement dans discord.db (hors du ledger).
+_balances = {}
+_balances_lock = threading.Lock()
+WALLET_CACHE_TTL = float(os.getenv('WALLET_CACHE_TTL', '5'))
+
+
+def _cache_balance(discord_id: str, balance: int, read_at: float = None):
+    """Publie un solde, sauf si une valeur plus récente a été publiée entre-temps"""
+    read_at = read_at if read_at is not None else time.monotonic()
+    with _balances_lock:
+        cached = _balances.get(discord_id)
+        if cached and cached[1] > read_at:
+            return cached[0]
+        _balances[discord_id] = (balance, read_at)
+        return balance
+
+
+def _cached_balance(discord_id: str):
+    """Retourne le solde en cache s'il est encore valide, None sinon"""
+    cached = _balances.get(discord_id)
+    if cached and time.monotonic() - cached[1] < WALLET_CACHE_TTL:
+        return cached[0]
+    return None
+
+
+def apply_delta(discord_id: str, delta: int, reason: str, ref: str = None, allow_negative: bool = False, path: str = DB_PATH):
+    """
+    Applique un mouvement au wallet d'un joueur et l'inscrit dans le ledger, dans la transaction
+    en cours (ou dans une nouvelle transaction).
+    Un débit est refusé si le solde est insuffisant (sauf allow_negative).
+    Retourne le nouveau solde, ou None si le joueur est inconnu ou le solde insuffisant.
+    Lève une exception en cas d'erreur SQL.
+    """
+    with transaction(path) as conn:
+        if delta < 0 and not allow_negative:
+            # Débit conditionnel en une seule requête : échoue si le solde a changé entre-temps
+            c = conn.execute('UPDATE users SET wallet = COALESCE(wallet, 0) + ? WHERE discord_id = ? AND COALESCE(wallet, 0) >= ?',
+                             (delta, discord_id, -delta))
+        else:
+            c = conn.execute('UPDATE users SET wallet = COALESCE(wallet, 0) + ? WHERE discord_id = ?', (delta, discord_id))
+        if c.rowcount == 0:
+            return None
+        balance = conn.execute('SELECT wallet FROM users WHERE discord_id = ?', (discord_id,)).fetchone()[0]
+        conn.execute('''
+            INSERT INTO wallet_ledger (discord_id, delta, balance_after, reason, ref)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (discord_id, delta, balance, reason, ref))
+        on_commit(lambda: _cache_balance(discord_id, balance), path)
+        return balance
+
+
+def set_balance(discord_id: str, balance: int, reason: str, path: str = DB_PATH):
+    """Fixe le solde d'un joueur (le mouvement correspondant est inscrit dans le ledger)"""
+    with transaction(path) as conn:
+        row = conn.execute('SELECT COALESCE(wallet, 0) FROM users WHERE discord_id = ?', (discord_id,)).fetchone()
+        if not row:
+            return None
+        return apply_delta(discord_id, balance - row[0], reason, allow_negative=True, path=path)
+
+
+class DatabaseWallet:
+    def __init__(self):
+        """Initialise le ledger des mouvements de wallet"""
+        self.db_path = 'discord.db'
+        self._initialize_db()
+
+    def _initialize_db(self):
+        """Met le schéma de la base à jour (table wallet_ledger et soldes d'ouverture)"""
+        run_migrations(self.db_path)
+
+    def credit(self, discord_id: str, amount: int, reason: str, ref: str = None):
+        """Crédite le wallet d'un joueur et retourne le nouveau solde (None si joueur inconnu ou erreur)"""
+        try:
+            return apply_delta(discord_id, abs(amount), reason, ref, path=self.db_path)
+        except Exception as e:
+            logger.error(f"Erreur lors du crédit de {amount} pour {discord_id}: {e}")
+            return None
+
+    def debit(self, discord_id: str, amount: int, reason: str, ref: str = None):
+        """
+        Débite le wallet d'un joueur si le solde le permet.
+        Retourne (True, nouveau solde), (False, solde actuel) si le solde est insuffisant, ou (False, None) en cas d'erreur.
+        """
+        try:
+            balance = apply_delta(discord_id, -abs(amount), reason, ref, path=self.db_path)
+            if balance is None:
+                return False, self.get_balance(discord_id)
+            return True, balance
+        except Exception as e:
+            logger.error(f"Erreur lors du débit de {amount} pour {discord_id}: {e}")
+            return False, None
+
+    def get_balance(self, discord_id: str):
+        """Retourne le solde d'un joueur (depuis le cache s'il est récent), None si le joueur est inconnu"""
+        balance = _cached_balance(discord_id)
+        if balance is not None:
+            return balance
+        read_at = time.monotonic()
+        try:
+            row = get_connection(self.db_path).execute('SELECT COALESCE(wallet, 0) FROM users WHERE discord_id = ?', (discord_id,)).fetchone()
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture du solde de {discord_id}: {e}")
+            return None
+        if not row:
+            return None
+        # Ne pas écraser une valeur publiée entre-temps par un mouvement validé
+        return _cache_balance(discord_id, row[0], read_at)
+
+    def get_ledger_balance(self, discord_id: str):
+        """Recalcule le solde d'un joueur à partir du ledger"""
+        try:
+            row = get_connection(self.db_path).execute('SELECT COALESCE(SUM(delta), 0) FROM wallet_ledger WHERE discord_id = ?', (discord_id,)).fetchone()
+            return row[0]
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul du solde de {discord_id}: {e}")
+            return None
+
+    # Versions asynchrones : écritures sur le thread d'écriture unique, lectures sur les threads de lecture
+
+    async def credit_async(self, discord_id: str, amount: int, reason: str, ref: str = None):
+        return await run_write(self.credit, discord_id, amount, reason, ref)
+
+    async def debit_async(self, discord_id: str, amount: int, reason: str, ref: str = None):
+        return await run_write(self.debit, discord_id, amount, reason, ref)
+
+    async def get_balance_async(self, discord_id: str):
+        balance = _cached_balance(discord_id)
+        if balance is not None:
+            return balance
+        return await run_read(self.get_balance, discord_id)
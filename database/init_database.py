@@ -1,32 +1,19 @@
 import os
 import sys
-import importlib
-import sqlite3
 
 # Ajouter le répertoire parent au PYTHONPATH
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 def init_database():
-    """Initialise la base de données en créant toutes les tables nécessaires"""
+    """Initialise la base de données : applique les migrations de schéma en attente"""
     print("Initialisation de la base de données...")
     
-    # Vérifier si la base de données existe, sinon la créer
-    if not os.path.exists('discord.db'):
-        print("Création de la base de données discord.db")
-        conn = sqlite3.connect('discord.db')
-        conn.close()
-    
-    # Importer et exécuter tous les scripts de création de tables
     try:
-        # Importer le script de création des tables d'items
-        from database.create_items_table import create_items_tables
-        create_items_tables()
-        
-        # Ajouter ici d'autres scripts d'initialisation si nécessaire
-        # from database.another_script import another_function
-        # another_function()
+        # Crée discord.db si besoin puis applique les migrations (tables, colonnes, index)
+        from database.migrations import run_migrations
+        version = run_migrations()
         
-        print("Base de données initialisée avec succès!")
+        print(f"Base de données initialisée avec succès! (schéma version {version})")
         return True
     except Exception as e:
         print(f"Erreur lors de l'initialisation de la base de données: {e}")
@@ -0,0 +1,247 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from config.logging_config import setup_logging
+from database.connection import DB_PATH, get_connection, transaction
+
+logger = setup_logging()
+
+# Bases déjà migrées par ce processus (les constructeurs appellent run_migrations à chaque instanciation)
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _base_schema(conn):
+    """Tables historiques : users, classement, items et item_transactions (mise à niveau des anciennes bases)"""
+    from database.create_items_table import SHOP_ITEMS
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            discord_name TEXT NOT NULL,
+            discord_id TEXT NOT NULL UNIQUE,
+            player_name TEXT,
+            player_id TEXT,
+            wallet INTEGER DEFAULT 0,
+            RP INTEGER DEFAULT 0,
+            date_end_rp TIMESTAMP,
+            verification_code TEXT,
+            verification_timestamp TIMESTAMP,
+            verified BOOLEAN DEFAULT 0,
+            starter_pack BOOLEAN DEFAULT 0,
+            steam_id TEXT,
+            UNIQUE(discord_id, player_id)
+        )
+    ''')
+    # Colonnes ajoutées après la création des premières bases
+    columns = _columns(conn, 'users')
+    for column, definition in (('verified', 'BOOLEAN DEFAULT 0'), ('starter_pack', 'BOOLEAN DEFAULT 0'), ('steam_id', 'TEXT')):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE users ADD COLUMN {column} {definition}')
+            logger.info(f"Colonne '{column}' ajoutée à la table users")
+
+    # Ancienne table classement (sans id ni original_name) : reconstruite avec les noms normalisés
+    columns = _columns(conn, 'classement')
+    if columns and ('original_name' not in columns or 'id' not in columns):
+        conn.execute('ALTER TABLE classement RENAME TO classement_old')
+        logger.info("Migration de l'ancienne table classement")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS classement (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            player_name TEXT NOT NULL,
+            original_name TEXT NOT NULL,
+            kills INTEGER DEFAULT 0,
+            last_kill TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(player_name)
+        )
+    ''')
+    if 'player_name' in columns and ('original_name' not in columns or 'id' not in columns):
+        conn.execute('''
+            INSERT OR IGNORE INTO classement (player_name, original_name, kills, last_kill)
+            SELECT lower(trim(player_name)), player_name, kills, last_kill
+            FROM classement_old
+            WHERE player_name IS NOT NULL AND player_name != ''
+        ''')
+    conn.execute('DROP TABLE IF EXISTS classement_old')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            id_item_shop INTEGER NOT NULL,
+            count INTEGER DEFAULT 1,
+            price INTEGER DEFAULT 0,
+            cooldown INTEGER DEFAULT 0,
+            category TEXT,
+            enabled INTEGER DEFAULT 1
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS item_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            discord_id TEXT NOT NULL,
+            player_name TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            count INTEGER DEFAULT 1,
+            price INTEGER DEFAULT 0,
+            status TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            FOREIGN KEY (item_id) REFERENCES items (id)
+        )
+    ''')
+    # Boutique vide : ajouter les items par défaut
+    if conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0:
+        conn.executemany('''
+            INSERT INTO items (id, name, item_id, id_item_shop, count, price, cooldown, category, enabled)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', SHOP_ITEMS)
+        logger.info("Items du shop ajoutés")
+
+
+def _bot_state_schema(conn):
+    """Tables d'état du bot : kills traités, points de reprise des logs, file de livraison et ledger des wallets"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS processed_kills (
+            kill_key INTEGER PRIMARY KEY,
+            seen_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_processed_kills_seen_at ON processed_kills (seen_at)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS log_cursor (
+            path TEXT PRIMARY KEY,
+            byte_offset INTEGER NOT NULL DEFAULT 0,
+            last_line_ts TEXT,
+            size INTEGER,
+            head_hash TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS delivery_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            order_key TEXT NOT NULL,
+            discord_id TEXT NOT NULL,
+            steam_id TEXT NOT NULL,
+            item_name TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            count INTEGER DEFAULT 1,
+            price INTEGER DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_delivery_queue_status ON delivery_queue (status, next_attempt_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_delivery_queue_order ON delivery_queue (order_key)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS wallet_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            discord_id TEXT NOT NULL,
+            delta INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            ref TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_wallet_ledger_discord_id ON wallet_ledger (discord_id, id)')
+    # Soldes antérieurs au ledger : un mouvement d'ouverture pour que la somme des deltas retombe sur wallet
+    c = conn.execute('''
+        INSERT INTO wallet_ledger (discord_id, delta, balance_after, reason)
+        SELECT discord_id, wallet, wallet, 'opening'
+        FROM users
+        WHERE COALESCE(wallet, 0) != 0
+        AND discord_id NOT IN (SELECT discord_id FROM wallet_ledger)
+    ''')
+    if c.rowcount:
+        logger.info(f"Solde d'ouverture inscrit dans le ledger pour {c.rowcount} joueur(s)")
+
+
+def _lookup_indexes(conn):
+    """Index des recherches fréquentes"""
+    # VoteTracker : WHERE LOWER(player_name) = LOWER(?)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_player_name_lower ON users (LOWER(player_name))')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_steam_id ON users (steam_id)')
+    # !buy : WHERE id_item_shop = ? AND enabled = 1 ; !shop : WHERE enabled = 1 ORDER BY category, name
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_items_id_item_shop ON items (id_item_shop)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_items_enabled_category ON items (enabled, category, name)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_item_transactions_discord_id ON item_transactions (discord_id, timestamp)')
+
+
+def _catalog_version(conn):
+    """Compteur de version du catalogue, incrémenté par toute modification de la table items (même hors du bot)"""
+    conn.execute("INSERT OR IGNORE INTO bot_state (key, value) VALUES ('catalog_version', '0')")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_items_catalog_version_{event.lower()}
+            AFTER {event} ON items
+            BEGIN
+                UPDATE bot_state SET value = CAST(value AS INTEGER) + 1 WHERE key = 'catalog_version';
+            END
+        ''')
+
+
+# Migrations dans l'ordre : (version, description, fonction(conn)).
+# Ne jamais modifier une migration publiée : ajouter une nouvelle version.
+MIGRATIONS = [
+    (1, "tables historiques", _base_schema),
+    (2, "tables d'état du bot", _bot_state_schema),
+    (3, "index de recherche", _lookup_indexes),
+    (4, "version du catalogue du shop", _catalog_version),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _backup(conn, path):
+    """Sauvegarde la base avant de la migrer (copie cohérente, même en mode WAL)"""
+    backup_path = f'{path}.backup.{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+    target = sqlite3.connect(backup_path)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+    logger.info(f"Sauvegarde de {path} créée avant migration : {backup_path}")
+
+
+def run_migrations(path: str = DB_PATH) -> int:
+    """
+    Met le schéma de la base à jour (PRAGMA user_version) et retourne la version atteinte.
+    Chaque migration s'exécute une seule fois, dans sa propre transaction.
+    """
+    with _migrate_lock:
+        if path in _migrated:
+            return LATEST_VERSION
+        conn = get_connection(path)
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < LATEST_VERSION:
+            has_tables = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' LIMIT 1").fetchone()
+            if has_tables and os.getenv('DB_MIGRATION_BACKUP', '1') == '1':
+                _backup(conn, path)
+            for migration_version, description, migrate in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+                with transaction(path) as conn:
+                    migrate(conn)
+                    conn.execute(f'PRAGMA user_version = {migration_version}')
+                logger.info(f"Migration {migration_version} appliquée à {path} : {description}")
+                version = migration_version
+        _migrated.add(path)
+        return version
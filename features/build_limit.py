@@ -1,12 +1,14 @@
 import discord
 import asyncio
 from database.database_build import DatabaseBuildManager
+from utils.game_db_snapshot import GameDBSnapshot
 
 class BuildLimitTracker:
-    def __init__(self, bot, channel_id, ftp_handler):
+    def __init__(self, bot, channel_id, ftp_handler, game_db_snapshot=None):
         self.bot = bot
         self.channel_id = channel_id
         self.ftp_handler = ftp_handler
+        self.game_db_snapshot = game_db_snapshot or GameDBSnapshot(ftp_handler)
         self.is_running = False
         self.update_task = None
         self.LIMITE_CONSTRUCTION = 12000
@@ -46,8 +48,9 @@ class BuildLimitTracker:
         """Vérifie les constructions et envoie un rapport"""
         try:
             # Récupérer les données depuis le FTP
+            await self.game_db_snapshot.refresh_async()
             database = DatabaseBuildManager()
-            constructions = database.get_constructions_by_player(self.ftp_handler)
+            constructions = await database.get_constructions_by_player_async(self.game_db_snapshot)
             
             if not constructions:
                 message = "Aucune construction trouvée."
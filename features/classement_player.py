@@ -1,7 +1,7 @@
 from discord.ext import tasks
 from config.logging_config import setup_logging
 from database.database_classement import DatabaseClassement
-from utils.ftp_handler import FTPHandler
+from utils.game_db_snapshot import GameDBSnapshot
 import os
 from dotenv import load_dotenv
 import time
@@ -9,12 +9,14 @@ import time
 load_dotenv()
 
 class KillTracker:
-    def __init__(self, bot, channel_id):
+    def __init__(self, bot, channel_id, game_db_snapshot: GameDBSnapshot):
         """Initialise le tracker de kills"""
         self.bot = bot
         self.channel_id = channel_id
         self.db = DatabaseClassement()
-        self.ftp = FTPHandler()
+        self.game_db_snapshot = game_db_snapshot
+        # Index de détection des kills créés sur chaque nouvelle copie de game.db
+        self.game_db_snapshot.add_prepare_hook(self.db.prepare_snapshot)
         self.last_message = None
         self.last_update_time = 0
         self.last_stats = None
@@ -37,14 +39,11 @@ class KillTracker:
         if self.update_kills_task.is_running():
             self.update_kills_task.stop()
 
-    def format_kill_stats(self, stats):
+    def format_kill_stats(self, stats, total_players):
         """Formate les statistiques de kills pour l'affichage"""
         if not stats:
             return "```\nAucune statistique disponible\n```"
 
-        # Récupérer le nombre total de joueurs
-        total_players = self.db.get_total_players_count()
-
         message = "```\n🏆 Classement des Kills 🏆\n\n"
         message += "Rang | Joueur           | Kills\n"
         message += "-----|------------------|-------\n"
@@ -83,8 +82,9 @@ class KillTracker:
     async def update_kills_task(self):
         """Met à jour le classement des kills toutes les 10 secondes"""
         try:
-            # Vérifier les nouveaux kills
-            new_kills_detected = self.db.check_kills(self.ftp)
+            # Rafraîchir game.db sans bloquer la boucle, puis vérifier les nouveaux kills
+            await self.game_db_snapshot.refresh_async()
+            new_kills_detected = await self.db.check_kills_async(self.game_db_snapshot)
             
             current_time = time.time()
             channel = self.bot.get_channel(self.channel_id)
@@ -92,7 +92,7 @@ class KillTracker:
                 return
             
             # Récupérer les stats (top 30 seulement pour l'affichage)
-            stats = self.db.get_kill_stats()
+            stats = await self.db.get_kill_stats_async()
             if not stats:
                 return
             
@@ -102,7 +102,7 @@ class KillTracker:
             
             # Supprimer tous les anciens messages du bot
             await self.delete_bot_messages(channel)
-            message = self.format_kill_stats(stats)
+            message = self.format_kill_stats(stats, await self.db.get_total_players_count_async())
             self.last_message = await channel.send(message)
             self.last_stats = stats
             self.last_update_time = current_time
@@ -118,8 +118,8 @@ class KillTracker:
     async def display_kills(self, ctx):
         """Affiche le classement des kills"""
         try:
-            stats = self.db.get_kill_stats()
-            message = self.format_kill_stats(stats)
+            stats = await self.db.get_kill_stats_async()
+            message = self.format_kill_stats(stats, await self.db.get_total_players_count_async())
             await ctx.send(message)
         except Exception as e:
             await ctx.send(f"❌ Erreur lors de l'affichage du classement: {e}")
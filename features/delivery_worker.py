@@ -0,0 +1,127 @@
+import asyncio
+import os
+from collections import defaultdict
+from config.logging_config import setup_logging, log_error
+from database.database_delivery import DatabaseDelivery
+
+logger = setup_logging()
+
+
+class DeliveryWorker:
+    def __init__(self, bot, db=None):
+        """
+        Livre en arrière-plan les achats enregistrés dans delivery_queue.
+        Les achats sont déjà débités : une livraison qui échoue est retentée plus tard,
+        puis remboursée après DELIVERY_MAX_ATTEMPTS tentatives.
+        """
+        self.bot = bot
+        self.db = db or DatabaseDelivery()
+        self.is_running = False
+        self.update_task = None
+        self.poll_interval = float(os.getenv('DELIVERY_POLL_INTERVAL', '5'))
+        self.max_attempts = int(os.getenv('DELIVERY_MAX_ATTEMPTS', '5'))
+        self.retry_delay = float(os.getenv('DELIVERY_RETRY_DELAY', '30'))  # Doublé à chaque échec
+        self._wake = asyncio.Event()
+
+    async def start(self):
+        """Démarre le worker de livraison"""
+        if self.is_running:
+            return
+
+        self.is_running = True
+        # Livraisons interrompues par un arrêt du bot : elles sont reprises
+        await self.db.recover_in_progress_async()
+        self.update_task = self.bot.loop.create_task(self._update_loop())
+        logger.info("DeliveryWorker démarré")
+
+    async def stop(self):
+        """Arrête le worker de livraison"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        if self.update_task:
+            self.update_task.cancel()
+            try:
+                await self.update_task
+            except asyncio.CancelledError:
+                pass
+        logger.info("DeliveryWorker arrêté")
+
+    def notify(self):
+        """Signale qu'une commande vient d'être enregistrée (traitement immédiat)"""
+        self._wake.set()
+
+    async def _update_loop(self):
+        """Boucle de traitement de la file de livraison"""
+        while self.is_running:
+            try:
+                await self.process_due()
+            except Exception as e:
+                logger.error(f"Erreur dans la boucle de livraison : {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def process_due(self):
+        """Livre toutes les commandes dues, un lot RCON par joueur"""
+        rows = await self.db.claim_due_async()
+        if not rows:
+            return 0
+
+        by_player = defaultdict(list)
+        for row in rows:
+            by_player[(row[1], row[2])].append(row)
+
+        # Tous les joueurs en même temps : l'ordonnanceur d'ItemManager les sert à tour de rôle
+        await asyncio.gather(*[
+            self._deliver_safely(discord_id, steam_id, deliveries)
+            for (discord_id, steam_id), deliveries in by_player.items()
+        ])
+        return len(rows)
+
+    async def _deliver_safely(self, discord_id, steam_id, deliveries):
+        try:
+            await self._deliver(discord_id, steam_id, deliveries)
+        except Exception as e:
+            logger.error(f"Erreur lors de la livraison pour {discord_id}: {e}")
+            for delivery in deliveries:
+                await self.db.schedule_retry_async(delivery[0], str(e), self.retry_delay)
+
+    async def _deliver(self, discord_id, steam_id, deliveries):
+        item_manager = self.bot.item_manager
+        results, error_msg = await item_manager.give_items(steam_id, [(item_id, count) for _, _, _, _, item_id, count, _, _ in deliveries])
+        delivered_ok = [ok for _, _, ok in results] if results else [False] * len(deliveries)
+
+        given, refunded = [], []
+        for (delivery_id, _, _, item_name, _, count, price, attempts), ok in zip(deliveries, delivered_ok):
+            if ok:
+                await self.db.mark_delivered_async(delivery_id)
+                given.append(f"**{item_name}** (x{count})")
+                logger.info(f"Livraison {delivery_id} effectuée pour {discord_id}: {item_name} (x{count})")
+                continue
+
+            error = error_msg or "Échec du SpawnItem"
+            if attempts + 1 >= self.max_attempts:
+                await self.db.refund_async(delivery_id, error)
+                refunded.append(f"**{item_name}** ({price} coins)")
+                log_error("BUY_GIVE", f"Livraison abandonnée pour {discord_id} - Item: {item_name} (x{count}) - Erreur: {error}")
+            else:
+                delay = self.retry_delay * (2 ** attempts)
+                await self.db.schedule_retry_async(delivery_id, error, delay)
+                logger.warning(f"Livraison de {item_name} pour {discord_id} reportée de {delay:.0f}s (tentative {attempts + 1}/{self.max_attempts}): {error}")
+
+        if given:
+            await self._notify_player(discord_id, f"✅ Livraison effectuée : {', '.join(given)}.")
+        if refunded:
+            await self._notify_player(discord_id, f"❌ Livraison impossible après plusieurs tentatives : {', '.join(refunded)}. Vous avez été remboursé.")
+
+    async def _notify_player(self, discord_id, message):
+        """Envoie un message privé au joueur (sans bloquer la livraison en cas d'échec)"""
+        try:
+            user = self.bot.get_user(int(discord_id)) or await self.bot.fetch_user(int(discord_id))
+            await user.send(message)
+        except Exception as e:
+            logger.warning(f"Impossible d'envoyer le message de livraison à {discord_id}: {e}")
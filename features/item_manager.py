@@ -1,23 +1,23 @@
 import logging
-import sqlite3
-import threading
 import time
 import os
 from config.logging_config import setup_logging
 import asyncio
-import valve.rcon
+from utils.rate_limiter import PRIORITY_HIGH
+from utils.fair_scheduler import FairScheduler
+from database.connection import get_connection, run_read
 
 logger = setup_logging()
 
-# Verrou global pour éviter les appels multiples
-_global_lock = threading.Lock()
-
 class ItemManager:
     def __init__(self, bot, ftp_handler):
         """Initialise le gestionnaire d'items"""
         self.bot = bot
         self.ftp = ftp_handler
         self.rcon_client = bot.player_tracker.rcon_client
+        self.roster = bot.player_tracker.roster  # Liste des joueurs connectés partagée
+        # Livraisons sérialisées par joueur et servies à tour de rôle entre joueurs
+        self.scheduler = FairScheduler(max_concurrent=int(os.getenv('ITEM_DELIVERY_CONCURRENCY', '2')))
         self.last_build_time = 0
         self.build_cooldown = 5  # 5 secondes de cooldown après un build
 
@@ -51,115 +51,107 @@ class ItemManager:
         """Met à jour le timestamp du dernier build"""
         self.last_build_time = time.time()
 
-    async def _execute_rcon_command(self, command, max_attempts=5):
-        """Exécute une commande RCON avec système de retry"""
-        attempts = 0
-        while attempts < max_attempts:
+    async def _execute_rcon_command(self, command, max_attempts=3, auto_retry=True):
+        """
+        Exécute une commande RCON sur la session partagée du bot.
+        La connexion reste authentifiée entre les commandes (reconnexion gérée par RCONClient),
+        seul le refus "Too many commands" est réessayé, au rythme du limiteur.
+        Avec auto_retry=False, une commande dont la réponse n'est pas arrivée (timeout, connexion perdue)
+        n'est pas renvoyée : le serveur a pu l'exécuter, la décision de réessayer revient à l'appelant.
+        """
+        for attempt in range(1, max_attempts + 1):
             try:
-                with valve.rcon.RCON((self.rcon_client.host, self.rcon_client.port), self.rcon_client.password) as rcon:
-                    response = rcon.execute(command)
-                    logger.info(f"Réponse RCON: {response.text}")
-                    return True, response.text
-            except valve.rcon.RCONAuthenticationError:
-                logger.error("Erreur d'authentification RCON")
-                attempts += 1
-                await asyncio.sleep(1)
-            except ConnectionResetError:
-                logger.error("Erreur de connexion au serveur (karma)")
-                attempts += 5  # On attend plus longtemps en cas de karma
-                await asyncio.sleep(5)
+                response = await self.rcon_client.execute(command, auto_retry=auto_retry, priority=PRIORITY_HIGH)
+                logger.info(f"Réponse RCON: {response}")
+                return True, response
+            except RuntimeError as e:
+                # "Too many commands" : refusée par le serveur sans être exécutée, on peut la renvoyer
+                if "Too many commands" in str(e) and attempt < max_attempts:
+                    continue
+                logger.error(f"Erreur RCON: {e}")
+                return False, None
             except Exception as e:
                 logger.error(f"Erreur RCON: {e}")
-                attempts += 1
-                await asyncio.sleep(1)
+                return False, None
         return False, None
 
-    async def give_starter_pack_by_steam_id(self, steam_id):
-        """Donne le pack de départ à un joueur via RCON en utilisant son Steam ID"""
-        if not self.can_modify_inventory():
-            logger.warning("Système verrouillé, impossible de donner le starter pack maintenant")
+    async def _spawn_item(self, player_conid, player_name, item_id, quantity):
+        """Envoie un SpawnItem et retourne True si le serveur l'a accepté"""
+        try:
+            # Utiliser la commande RCON avec le conid du joueur
+            command = f"con {player_conid} SpawnItem {item_id} {quantity}"
+            logger.info(f"Exécution de la commande: {command}")
+
+            # Pas de renvoi automatique : un SpawnItem sans réponse a peut-être été exécuté,
+            # le renvoyer risquerait de livrer l'item deux fois (la file de livraison décide du réessai)
+            success, response = await self._execute_rcon_command(command, auto_retry=False)
+            if not success:
+                logger.warning(f"SpawnItem {item_id} (x{quantity}) pour '{player_name}' non confirmé par le serveur, livraison considérée comme échouée")
+                return False
+            if "Couldn't find a valid player" not in response and "Unknown command" not in response:
+                logger.info(f"Item {item_id} (x{quantity}) ajouté avec succès pour '{player_name}'")
+                return True
+            logger.error(f"Échec de l'ajout de l'item {item_id} (x{quantity}) pour '{player_name}'. Réponse: {response}")
             return False
-
-        if not _global_lock.acquire(blocking=False):
-            logger.warning(f"Une autre opération est en cours pour le joueur avec Steam ID {steam_id}")
-            _global_lock.release()
+        except Exception as e:
+            logger.error(f"Erreur lors de l'ajout de l'item {item_id}: {e}")
             return False
 
+    async def give_items(self, steam_id, items):
+        """
+        Livre plusieurs items à un joueur en une seule opération.
+        - items : liste de (template_id, quantité)
+        Retourne (résultats, message d'erreur) ; résultats contient un (template_id, quantité, succès) par item.
+        """
+        if not self.can_modify_inventory():
+            logger.warning("Système verrouillé, impossible de donner les items maintenant")
+            return [], "Système verrouillé, réessaie dans quelques secondes."
+
+        # Les demandes simultanées sont mises en file plutôt que refusées
+        return await self.scheduler.run(steam_id, lambda: self._give_items(steam_id, items))
+
+    async def _give_items(self, steam_id, items):
+        """Livraison effective d'un lot (exécutée par l'ordonnanceur, une seule à la fois par joueur)"""
         try:
-            logger.info(f"Début de l'ajout du pack de départ pour le joueur avec Steam ID {steam_id}")
-            
-            # Récupérer les informations des joueurs en ligne
-            resp = self.rcon_client.execute("ListPlayers")
-            logger.info(f"Réponse brute de ListPlayers: {resp}")
-            
-            # Extraire les informations des joueurs
-            lines = resp.splitlines()
-            if lines and ("Idx" in lines[0] or "Char name" in lines[0] or "Player name" in lines[0]):
-                lines = lines[1:]
-            
-            # Chercher le joueur par son Steam ID
-            target_player_name = None
-            player_conid = None
-            
-            for line in lines:
-                if steam_id in line:
-                    parts = line.split("|")
-                    if len(parts) >= 2:
-                        target_player_name = parts[1].strip()
-                        player_conid = parts[0].strip()  # Récupérer le conid (index du joueur)
-                        break
-            
-            if not target_player_name or not player_conid:
+            # Le conid (index temporaire du joueur) est résolu une seule fois pour tout le lot,
+            # à partir d'une liste des joueurs rafraîchie à l'instant (un seul ListPlayers par lot)
+            player = await self.roster.find_by_steam_id(steam_id, force_refresh=True)
+            if not player or not player.conid:
                 logger.error(f"Joueur avec Steam ID {steam_id} non trouvé en ligne ou ID manquant")
-                return False
+                return [], "Tu dois être connecté en jeu pour recevoir l'item."
 
-            # Le conid est temporaire, pas besoin de le sauvegarder
-
-            success_count = 0
-            error_count = 0
-            
-            for item_data in self.starter_items:
-                try:
-                    # Décomposer le tuple (item_id, quantité)
-                    item_id, quantity = item_data
-                    # Utiliser la commande RCON avec le conid du joueur
-                    command = f"con {player_conid} SpawnItem {item_id} {quantity}"
-                    logger.info(f"Exécution de la commande: {command}")
-                    
-                    success, response = await self._execute_rcon_command(command)
-                    if success and "Couldn't find a valid player" not in response:
-                        logger.info(f"Item {item_id} (x{quantity}) ajouté avec succès pour '{target_player_name}'")
-                        success_count += 1
-                    else:
-                        logger.error(f"Échec de l'ajout de l'item {item_id} (x{quantity}) pour '{target_player_name}'")
-                        error_count += 1
-                    
-                    # Attendre un peu entre chaque commande
-                    await asyncio.sleep(0.2)
-                    
-                except Exception as e:
-                    logger.error(f"Erreur lors de l'ajout de l'item {item_id}: {e}")
-                    error_count += 1
-            
-            logger.info(f"Starter pack pour '{target_player_name}' (Steam ID: {steam_id}): {success_count} items ajoutés, {error_count} échecs")
-            return success_count > 0
+            # Les commandes du lot entrent ensemble dans la file du limiteur RCON et partent
+            # sur la même connexion authentifiée, sans attendre la réponse de la précédente
+            delivered = await asyncio.gather(*[
+                self._spawn_item(player.conid, player.char_name, item_id, quantity)
+                for item_id, quantity in items
+            ])
+            results = [(item_id, quantity, ok) for (item_id, quantity), ok in zip(items, delivered)]
+
+            success_count = sum(delivered)
+            logger.info(f"Livraison pour '{player.char_name}' (Steam ID: {steam_id}): {success_count} items ajoutés, {len(items) - success_count} échecs")
+            return results, None
 
         except Exception as e:
-            logger.error(f"Erreur lors de l'ajout du pack de départ: {e}")
+            logger.error(f"Erreur lors de la livraison des items: {e}")
             import traceback
             logger.error(traceback.format_exc())
+            return [], f"Erreur interne: {e}"
+
+    async def give_starter_pack_by_steam_id(self, steam_id):
+        """Donne le pack de départ à un joueur via RCON en utilisant son Steam ID"""
+        logger.info(f"Début de l'ajout du pack de départ pour le joueur avec Steam ID {steam_id}")
+        results, error_msg = await self.give_items(steam_id, self.starter_items)
+        if error_msg:
+            logger.warning(f"Pack de départ non livré pour le joueur avec Steam ID {steam_id}: {error_msg}")
             return False
-        finally:
-            _global_lock.release()
+        return any(ok for _, _, ok in results)
 
     def get_player_steamid(self, discord_id):
         """Récupère le steam_id du joueur à partir de son Discord ID (si synchronisé)"""
         try:
-            conn = sqlite3.connect('discord.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT steam_id FROM users WHERE discord_id = ?", (discord_id,))
+            cursor = get_connection().execute("SELECT steam_id FROM users WHERE discord_id = ?", (discord_id,))
             row = cursor.fetchone()
-            conn.close()
             if not row:
                 logger.warning(f"Aucun utilisateur trouvé pour discord_id {discord_id}")
                 return None
@@ -168,69 +160,35 @@ class ItemManager:
             logger.error(f"Erreur lors de la récupération du steam_id: {e}")
             return None
 
-    def get_conid_from_steamid(self, steam_id):
-        """Récupère le conid (index temporaire) du joueur à partir de son steam_id via ListPlayers"""
+    async def get_player_steamid_async(self, discord_id):
+        """Version asynchrone de get_player_steamid (requête exécutée hors de la boucle asyncio)"""
+        return await run_read(self.get_player_steamid, discord_id)
+
+    async def get_conid_from_steamid(self, steam_id):
+        """Récupère le conid (index temporaire) du joueur à partir de son steam_id via la liste des joueurs connectés"""
         try:
-            resp = self.rcon_client.execute("ListPlayers")
-            if not resp or not steam_id:
-                return None
-            lines = resp.splitlines()
-            if lines and ("Idx" in lines[0] or "Char name" in lines[0] or "Player name" in lines[0]):
-                lines = lines[1:]
-            for line in lines:
-                if steam_id in line:
-                    parts = line.split("|")
-                    if len(parts) >= 2:
-                        conid = parts[0].strip()
-                        return conid
-            return None
+            player = await self.roster.find_by_steam_id(steam_id, force_refresh=True)
+            return player.conid if player else None
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du conid: {e}")
             return None
 
     async def give_item_to_player(self, discord_id, item_id, count=1):
         """Donne un item spécifique à un joueur via son Discord ID (utilise conid comme identifiant RCON)"""
-        if not self.can_modify_inventory():
-            logger.warning("Système verrouillé, impossible de donner l'item maintenant")
-            return False, "Système verrouillé, réessaie dans quelques secondes."
-        
-        if not _global_lock.acquire(blocking=False):
-            logger.warning(f"Une autre opération est en cours")
-            return False, "Une autre opération est en cours, réessaie dans quelques secondes."
-        
-        try:
-            steam_id = self.get_player_steamid(discord_id)
-            if not steam_id:
-                return False, "Tu n'es pas enregistré. Utilise !register d'abord."
-            conid = self.get_conid_from_steamid(steam_id)
-            if not conid:
-                return False, "Tu dois être connecté en jeu pour recevoir l'item."
-            # Exécuter la commande RCON avec le conid
-            command = f"con {conid} SpawnItem {item_id} {count}"
-            response = self.rcon_client.execute(command)
-            if response and "Unknown command" not in response:
-                logger.info(f"Item {item_id} (x{count}) ajouté avec succès pour conid {conid}")
-                return True, None
-            else:
-                logger.error(f"Échec de l'ajout de l'item {item_id} pour conid {conid}. Réponse: {response}")
-                return False, f"Erreur lors du give: {response}"
-        except Exception as e:
-            logger.error(f"Erreur lors de l'ajout de l'item {item_id}: {e}")
-            return False, f"Erreur interne: {e}"
-        finally:
-            _global_lock.release()
-
-    def is_player_online(self, steam_id):
+        steam_id = await self.get_player_steamid_async(discord_id)
+        if not steam_id:
+            return False, "Tu n'es pas enregistré. Utilise !register d'abord."
+        results, error_msg = await self.give_items(steam_id, [(item_id, count)])
+        if error_msg:
+            return False, error_msg
+        if not results[0][2]:
+            return False, "Erreur lors du give, réessaie plus tard."
+        return True, None
+
+    async def is_player_online(self, steam_id):
         """Vérifie si le joueur avec ce steam_id est connecté au serveur Conan"""
         try:
-            resp = self.rcon_client.execute("ListPlayers")
-            if not resp or not steam_id:
-                return False
-            lines = resp.splitlines()
-            for line in lines:
-                if steam_id in line:
-                    return True
-            return False
+            return await self.roster.find_by_steam_id(steam_id) is not None
         except Exception as e:
             logger.error(f"Erreur lors de la vérification de la présence en ligne: {e}")
             return False 
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+from config.logging_config import setup_logging
+from utils.player_list_parser import parse_list_players
+from utils.rate_limiter import PRIORITY_LOW
+
+logger = setup_logging()
+
+
+class PlayerRoster:
+    def __init__(self, rcon_client, ttl: float = None, poll_interval: float = None, min_refresh_interval: float = 2):
+        """
+        Liste des joueurs connectés partagée par tout le bot.
+        Une seule tâche interroge ListPlayers ; les consommateurs lisent le cache
+        et ne demandent un rafraîchissement immédiat qu'en cas d'absence ou d'expiration.
+        - ttl : durée (secondes) pendant laquelle la liste est considérée à jour
+        - poll_interval : intervalle entre deux rafraîchissements périodiques
+        - min_refresh_interval : délai minimum entre deux rafraîchissements provoqués par un cache miss
+        """
+        self.rcon_client = rcon_client
+        self.ttl = ttl if ttl is not None else float(os.getenv('ROSTER_TTL', '60'))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('ROSTER_POLL_INTERVAL', '60'))
+        self.min_refresh_interval = min_refresh_interval
+
+        self.entries = []
+        self.updated_at = 0  # Dernier rafraîchissement réussi (0 = jamais ou liste marquée périmée)
+        self.fetched_at = 0  # Dernier rafraîchissement réussi, non remis à zéro par mark_stale
+        self.attempted_at = 0  # Dernière interrogation du serveur, réussie ou non
+        self._by_steam_id = {}
+        self._by_conid = {}
+        self._by_char_name = {}
+
+        self._wake = asyncio.Event()
+        self._waiters = []  # Futures résolues à la fin du prochain rafraîchissement
+        self._poll_task = None
+
+    def _index(self, entries):
+        self.entries = entries
+        self._by_conid = {entry.conid: entry for entry in entries}
+        self._by_char_name = {entry.char_name.lower(): entry for entry in entries}
+        self._by_steam_id = {player_id: entry for entry in entries for player_id in entry.ids}
+        self.updated_at = self.fetched_at = time.monotonic()
+
+    def is_fresh(self) -> bool:
+        return bool(self.updated_at) and time.monotonic() - self.updated_at < self.ttl
+
+    def mark_stale(self):
+        """Force le prochain accès à rafraîchir la liste (connexion/déconnexion détectée)"""
+        self.updated_at = 0
+
+    async def _fetch(self):
+        """Interroge ListPlayers et met à jour les index"""
+        self.attempted_at = time.monotonic()
+        try:
+            resp = await self.rcon_client.execute("ListPlayers", priority=PRIORITY_LOW)
+            self._index(parse_list_players(resp))
+            logger.debug(f"Liste des joueurs mise à jour: {len(self.entries)} joueur(s) connecté(s)")
+        except Exception as e:
+            logger.error(f"Erreur lors du rafraîchissement de la liste des joueurs: {e}")
+
+    async def _poll_loop(self):
+        """Seule tâche qui interroge le serveur : périodiquement ou dès qu'un consommateur le demande"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            waiters, self._waiters = self._waiters, []
+            await self._fetch()
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def start(self):
+        """Démarre la tâche de rafraîchissement (premier rafraîchissement immédiat)"""
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop())
+            self._wake.set()
+            logger.info("Suivi de la liste des joueurs démarré")
+
+    async def stop(self):
+        if self._poll_task:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        # Ne pas laisser de consommateur attendre un rafraîchissement qui n'aura pas lieu
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def refresh(self):
+        """Demande un rafraîchissement immédiat et attend qu'il soit terminé (un seul ListPlayers pour tous)"""
+        await self.start()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._wake.set()
+        await waiter
+
+    def _can_refresh(self) -> bool:
+        """Évite de réinterroger le serveur en boucle (cache miss répétés ou serveur injoignable)"""
+        return time.monotonic() - self.attempted_at >= self.min_refresh_interval
+
+    async def _ensure_fresh(self):
+        if not self.is_fresh() and self._can_refresh():
+            await self.refresh()
+
+    async def _lookup(self, index_name, key, force_refresh: bool = False):
+        if force_refresh:
+            # Valeur destinée à cibler une commande RCON : les Idx sont réattribués au fil des connexions,
+            # seule une liste obtenue à l'instant fait foi
+            await self.refresh()
+            if self.fetched_at < self.attempted_at:
+                return None  # Rafraîchissement échoué
+            return getattr(self, index_name).get(key)
+        await self._ensure_fresh()
+        entry = getattr(self, index_name).get(key)
+        if entry is None and self._can_refresh():
+            # Absent du cache : le joueur vient peut-être de se connecter
+            await self.refresh()
+            entry = getattr(self, index_name).get(key)
+        if not self.fetched_at or time.monotonic() - self.fetched_at >= self.ttl:
+            # Serveur injoignable depuis plus de ttl secondes : ne pas servir une liste périmée
+            return None
+        return entry
+
+    async def find_by_steam_id(self, steam_id, force_refresh: bool = False):
+        """
+        Retourne l'entrée du joueur connecté avec ce Steam ID (None s'il n'est pas en ligne).
+        Avec force_refresh, la liste est réinterrogée avant la recherche (None si le serveur ne répond pas).
+        """
+        if not steam_id:
+            return None
+        return await self._lookup('_by_steam_id', str(steam_id).strip(), force_refresh)
+
+    async def find_by_conid(self, conid):
+        return await self._lookup('_by_conid', str(conid).strip())
+
+    async def find_by_char_name(self, char_name):
+        if not char_name:
+            return None
+        return await self._lookup('_by_char_name', char_name.strip().lower())
+
+    async def online_players(self):
+        """Retourne la liste des joueurs connectés (None si elle n'a jamais pu être récupérée)"""
+        await self._ensure_fresh()
+        if not self.updated_at:
+            return None
+        return list(self.entries)
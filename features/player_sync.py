@@ -1,13 +1,14 @@
 import random
 import string
-import re
 import sqlite3
 from datetime import datetime, timedelta
 from discord.ext import tasks
 from config.logging_config import setup_logging
 from database.database_sync import DatabaseSync
-from database.database_classement import DatabaseClassement
+from database.database_log_cursor import DatabaseLogCursor
 from utils.ftp_handler import FTPHandler
+from utils.log_tailer import LogTailer
+from utils.log_events import extract_events, ChatEvent, LoginEvent, LogoutEvent
 
 class PlayerSync:
     def __init__(self, bot, log_file_path, ftp_handler=None):
@@ -15,8 +16,9 @@ class PlayerSync:
         self.bot = bot
         self.log_file_path = log_file_path
         self.ftp = ftp_handler or FTPHandler()
+        # Position de lecture sauvegardée dans discord.db : pas de relecture complète au redémarrage
+        self.log_tailer = LogTailer(self.ftp, log_file_path, cursor_store=DatabaseLogCursor())
         self.db = DatabaseSync()
-        self.classement_db = DatabaseClassement()
         self.game_db_path = 'game.db'
         self.verification_codes = {}
         self.verification_timeouts = {}
@@ -29,7 +31,7 @@ class PlayerSync:
         """Démarre le processus de vérification pour un utilisateur"""
         try:
             verification_code = self.generate_verification_code()
-            self.db.create_verification(
+            await self.db.create_verification_async(
                 str(ctx.author.id),
                 ctx.author.name,
                 verification_code
@@ -39,83 +41,43 @@ class PlayerSync:
         except Exception as e:
             await ctx.send("❌ Une erreur est survenue lors de la génération du code de vérification.")
 
-    def parse_log_line(self, line):
-        """Parse une ligne de log pour extraire les informations du joueur"""
-        try:
-            # Format attendu : [2025.06.01-17.57.38:972][555]ChatWindow: Character pago-fraise (uid 12364, player 76561198276177053) said: message
-            match = re.search(r'Character ([^()]+) \(uid (\d+), player (\d+)\) said: (.+)', line)
-            if match:
-                char_name = match.group(1).strip()
-                uid = match.group(2)
-                steam_id = match.group(3)
-                message = match.group(4).strip()
-                return char_name, uid, steam_id, message
-        except Exception as e:
-            pass
-        return None, None, None, None
-
-    def parse_kill_line(self, line):
-        """Parse une ligne de log pour détecter un kill"""
-        try:
-            # Format attendu : [2025.06.01-17.57.38:972][555]LogKill: Killer: pago-fraise (uid 12364) killed Victim: victime-name (uid 56789)
-            match = re.search(r'LogKill: Killer: ([^()]+) \(uid (\d+)\) killed Victim: ([^()]+) \(uid (\d+)\)', line)
-            if match:
-                killer_name = match.group(1).strip()
-                killer_uid = match.group(2)
-                victim_name = match.group(3).strip()
-                victim_uid = match.group(4)
-                return killer_name, killer_uid, victim_name, victim_uid
-        except Exception as e:
-            pass
-        return None, None, None, None
-
     @tasks.loop(seconds=5)
     async def check_logs(self):
-        """Vérifie les logs pour les codes de vérification et les kills"""
+        """Vérifie les logs pour les codes de vérification et les connexions/déconnexions"""
         try:
-            # Lire les logs
-            log_content = self.ftp.read_database(self.log_file_path)
-            if not log_content:
+            # Lire uniquement les lignes ajoutées depuis le dernier passage
+            new_lines = await self.log_tailer.read_new_lines_async()
+            if not new_lines:
                 return
 
-            # Convertir en texte et filtrer les lignes
-            log_text = log_content.decode('utf-8', errors='ignore')
-            chat_lines = [line for line in log_text.splitlines() if 'ChatWindow' in line]
-            kill_lines = [line for line in log_text.splitlines() if 'LogKill' in line]
-            
-            # Traiter les kills
-            for line in kill_lines:
-                killer_name, killer_uid, victim_name, victim_uid = self.parse_kill_line(line)
-                if killer_name and killer_uid and victim_name and victim_uid:
-                    # Vérifier si les joueurs sont valides
-                    if self.classement_db.is_valid_player(killer_name) and self.classement_db.is_valid_player(victim_name):
-                        # Mettre à jour les statistiques
-                        self.classement_db.update_kill_stats(killer_uid, killer_name, victim_uid, victim_name)
+            pending_codes = None  # code -> discord_id, chargé au premier message de chat
+            roster_changed = False
+
+            # Un seul passage sur les nouvelles lignes
+            for event in extract_events(new_lines):
+                if isinstance(event, ChatEvent):
+                    if pending_codes is None:
+                        pending_codes = {code: discord_id for discord_id, code in await self.db.get_pending_verifications_async()}
+                    # Le message doit correspondre exactement au code
+                    discord_id = pending_codes.get(event.message)
+                    if discord_id and event.char_name and event.uid:
+                        if await self.db.verify_player_async(discord_id, event.char_name, event.uid, event.steam_id):
+                            del pending_codes[event.message]
+                            # Envoyer un message de confirmation
+                            user = self.bot.get_user(int(discord_id))
+                            if user:
+                                await user.send(f"✅ Votre compte a été vérifié avec succès!\n")
+                elif isinstance(event, (LoginEvent, LogoutEvent)):
+                    roster_changed = True
+                # Les kills sont comptés depuis game.db par KillTracker
 
-            # Traiter les codes de vérification
-            pending_verifications = self.db.get_pending_verifications()
+            # Un joueur s'est connecté ou déconnecté : la liste des joueurs en cache n'est plus à jour
+            player_tracker = getattr(self.bot, 'player_tracker', None)
+            if roster_changed and player_tracker:
+                player_tracker.roster.mark_stale()
 
-            for discord_id, code in pending_verifications:
-                # Chercher le code dans les lignes de chat
-                for line in chat_lines:
-                    if code in line:
-                        # Extraire les informations du joueur
-                        char_name, uid, steam_id, message = self.parse_log_line(line)
-                        if char_name and uid and message:
-                            # Vérifier que le message correspond exactement au code
-                            if message == code:
-                                # Vérifier le joueur
-                                if self.db.verify_player(discord_id, char_name, uid, steam_id):
-                                    # Envoyer un message de confirmation
-                                    user = self.bot.get_user(int(discord_id))
-                                    if user:
-                                        await user.send(f"✅ Votre compte a été vérifié avec succès!\n")
-                                else:
-                                    pass
-                            else:
-                                pass
-                        else:
-                            pass
+            # Lignes traitées : sauvegarder la position pour le prochain démarrage
+            await self.log_tailer.checkpoint_async()
 
         except Exception as e:
             pass
@@ -131,7 +93,7 @@ class PlayerSync:
     async def get_player_info(self, ctx):
         """Affiche les informations d'un joueur"""
         try:
-            info = self.db.get_player_info(str(ctx.author.id))
+            info = await self.db.get_player_info_async(str(ctx.author.id))
             if info:
                 discord_name, player_name, player_id, wallet, rp, date_end_rp, steam_id = info
                 message = f"```\nInformations du joueur :\n"
@@ -9,14 +9,16 @@ import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.rcon_client import RCONClient
+from features.player_roster import PlayerRoster
 
 logger = logging.getLogger(__name__)
 
 class PlayerTracker:
-    def __init__(self, bot, channel_id, rcon_client):
+    def __init__(self, bot, channel_id, rcon_client, roster=None):
         self.bot = bot
         self.channel_id = channel_id
         self.rcon_client = rcon_client
+        self.roster = roster or PlayerRoster(rcon_client)  # Liste des joueurs partagée avec les commandes
         self.is_running = False
         self.update_task = None
         self.last_player_count = 0  # Garder en mémoire le dernier nombre de joueurs
@@ -27,6 +29,7 @@ class PlayerTracker:
             return
         
         self.is_running = True
+        await self.roster.start()
         self.update_task = self.bot.loop.create_task(self._update_loop())
         logger.info("PlayerTracker démarré")
 
@@ -42,6 +45,7 @@ class PlayerTracker:
                 await self.update_task
             except asyncio.CancelledError:
                 pass
+        await self.roster.stop()
         logger.info("PlayerTracker arrêté")
 
     async def _update_loop(self):
@@ -59,9 +63,12 @@ class PlayerTracker:
     async def _update_channel_name(self):
         """Met à jour le nom du salon avec le nombre de joueurs"""
         try:
-            # Récupérer la liste des joueurs en ligne via RCON avec gestion d'erreurs robuste
+            # Récupérer la liste des joueurs en ligne (cache partagé, rafraîchi par PlayerRoster)
             try:
-                online = self.rcon_client.get_online_players()
+                online = await self.roster.online_players()
+                if online is None:
+                    logger.warning("Liste des joueurs indisponible, prochaine tentative dans 8 minutes")
+                    return
                 count = len(online)
                 logger.debug(f"Récupération réussie: {count} joueurs connectés")
                 
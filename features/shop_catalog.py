@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from collections import namedtuple
+from config.logging_config import setup_logging
+from database.connection import get_connection, run_read, run_write
+
+logger = setup_logging()
+
+# Item en vente dans le shop
+CatalogItem = namedtuple('CatalogItem', ['id_item_shop', 'name', 'item_id', 'count', 'price', 'category'])
+
+# Délai (secondes) entre deux vérifications du compteur de version du catalogue
+CATALOG_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', '30'))
+
+
+class ShopCatalog:
+    def __init__(self, check_interval: float = CATALOG_CHECK_INTERVAL):
+        """
+        Catalogue du shop gardé en mémoire (items activés).
+        - Chargé une fois au démarrage, indexé par id_item_shop et groupé par catégorie
+        - Rechargé quand le compteur catalog_version change (incrémenté par des triggers sur la table items,
+          donc aussi lors des modifications faites hors du bot), vérifié au plus toutes les check_interval secondes
+        """
+        self.check_interval = check_interval
+        self.version = None       # Version du catalogue chargé
+        self.checked_at = 0       # Dernière vérification de la version
+        self._by_shop_id = {}     # id_item_shop -> CatalogItem
+        self._by_category = {}    # catégorie -> [CatalogItem] triés par nom
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _read_version():
+        row = get_connection().execute("SELECT value FROM bot_state WHERE key = 'catalog_version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _read_catalog(self):
+        """Lit la version et les items activés dans une même transaction de lecture"""
+        conn = get_connection()
+        conn.execute('BEGIN')
+        try:
+            version = self._read_version()
+            rows = conn.execute('''
+                SELECT id_item_shop, name, item_id, count, price, category
+                FROM items
+                WHERE enabled = 1
+                ORDER BY category, name
+            ''').fetchall()
+        finally:
+            conn.execute('COMMIT')
+        return version, [CatalogItem(*row) for row in rows]
+
+    async def load(self):
+        """(Re)charge le catalogue depuis la base"""
+        async with self._lock:
+            version, items = await run_read(self._read_catalog)
+            by_category = {}
+            for item in items:
+                by_category.setdefault(item.category, []).append(item)
+            # Remplacement en une fois : les lecteurs voient l'ancien ou le nouveau catalogue, jamais un mélange
+            self._by_shop_id = {item.id_item_shop: item for item in items}
+            self._by_category = by_category
+            self.version = version
+            self.checked_at = time.monotonic()
+            logger.info(f"Catalogue du shop chargé : {len(items)} item(s), version {version}")
+
+    async def _ensure_fresh(self):
+        """Recharge le catalogue s'il n'a jamais été chargé ou si sa version a changé"""
+        if self.version is None:
+            await self.load()
+            return
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return
+        self.checked_at = time.monotonic()
+        try:
+            version = await run_read(self._read_version)
+        except Exception as e:
+            logger.error(f"Erreur lors de la vérification de la version du catalogue: {e}")
+            return
+        if version != self.version:
+            await self.load()
+
+    def _bump_version(self):
+        get_connection().execute("UPDATE bot_state SET value = CAST(value AS INTEGER) + 1 WHERE key = 'catalog_version'")
+
+    async def invalidate(self):
+        """Signale une modification du catalogue (commande d'administration) et le recharge immédiatement"""
+        await run_write(self._bump_version)
+        await self.load()
+
+    async def get(self, id_item_shop: int):
+        """Retourne l'item activé correspondant à id_item_shop, ou None"""
+        await self._ensure_fresh()
+        return self._by_shop_id.get(id_item_shop)
+
+    async def by_category(self):
+        """Retourne {catégorie: [CatalogItem]} pour les items activés"""
+        await self._ensure_fresh()
+        return self._by_category
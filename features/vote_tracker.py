@@ -3,10 +3,11 @@ import re
 from discord.ext import tasks
 from config.logging_config import setup_logging
 from database.database_sync import DatabaseSync
-import sqlite3
 import json
 import os
 from utils.ftp_handler import FTPHandler
+from database.connection import fetch_one_async, fetch_all_async
+from database.database_wallet import DatabaseWallet
 
 logger = setup_logging()
 
@@ -30,6 +31,7 @@ class VoteTracker:
         self.server_prive_channel_id = server_prive_channel_id
         self.ftp = ftp_handler or FTPHandler()
         self.db = DatabaseSync()
+        self.wallet = DatabaseWallet()
         self.last_votes = load_last_votes()
         self.last_top_server_message = self.last_votes.get('top_server', None)
         self.last_server_prive_message = self.last_votes.get('server_prive', None)
@@ -112,13 +114,8 @@ class VoteTracker:
         """Met à jour le wallet d'un joueur"""
         try:
             logger.info(f"Recherche du joueur {player_name} dans la base de données")
-            # Récupérer les informations du joueur
-            conn = sqlite3.connect('discord.db')
-            c = conn.cursor()
-            
             # Vérifier d'abord si le joueur existe
-            c.execute('SELECT player_name, verified, discord_id, wallet FROM users WHERE LOWER(player_name) = LOWER(?)', (player_name,))
-            result = c.fetchone()
+            result = await fetch_one_async('SELECT player_name, verified, discord_id, wallet FROM users WHERE LOWER(player_name) = LOWER(?)', (player_name,))
             
             if result:
                 db_player_name, verified, discord_id, wallet = result
@@ -128,14 +125,11 @@ class VoteTracker:
                 logger.info(f"Wallet actuel: {wallet}")
                 
                 if verified:
-                    new_wallet = wallet + 50
-                    # Mettre à jour le wallet
-                    c.execute('''
-                        UPDATE users
-                        SET wallet = ?
-                        WHERE discord_id = ?
-                    ''', (new_wallet, discord_id))
-                    conn.commit()
+                    # Créditer le wallet (incrément atomique inscrit au ledger)
+                    new_wallet = await self.wallet.credit_async(discord_id, 50, 'vote')
+                    if new_wallet is None:
+                        logger.error(f"Impossible de créditer le vote de {db_player_name}")
+                        return
                     logger.info(f"Wallet mis à jour: {wallet} -> {new_wallet}")
                     
                     # Envoyer un message au joueur
@@ -152,16 +146,13 @@ class VoteTracker:
             else:
                 logger.warning(f"Le joueur {player_name} n'existe pas dans la base de données")
                 # Afficher tous les joueurs dans la base pour debug
-                c.execute('SELECT player_name, verified FROM users')
-                all_players = c.fetchall()
+                all_players = await fetch_all_async('SELECT player_name, verified FROM users')
                 logger.info(f"Liste des joueurs dans la base: {all_players}")
             
         except Exception as e:
             logger.error(f"Erreur lors de la mise à jour du wallet: {e}")
             import traceback
             logger.error(traceback.format_exc())
-        finally:
-            conn.close()
 
     async def start(self):
         """Démarre le système de suivi des votes"""
@@ -0,0 +1,48 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+def compact_key(*parts) -> int:
+    """Réduit un identifiant composé (ex : tueur, victime, heure) à un entier 64 bits signé stockable dans SQLite"""
+    digest = hashlib.blake2b("\x1f".join(str(part) for part in parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class BoundedDedupCache:
+    def __init__(self, maxlen: int = 10000, ttl: float = 3600):
+        """
+        Ensemble borné des événements déjà traités, dans l'ordre d'insertion.
+        - maxlen : nombre maximum d'entrées gardées en mémoire (les plus anciennes sont évincées en premier)
+        - ttl : durée (secondes) au-delà de laquelle une entrée expire
+        Le ttl doit couvrir la fenêtre pendant laquelle un même événement peut être revu.
+        """
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> instant d'insertion
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        seen_at = self._entries.get(key)
+        return seen_at is not None and time.time() - seen_at < self.ttl
+
+    def add(self, key, seen_at: float = None):
+        """Enregistre une clé traitée et évince les entrées expirées ou en surnombre"""
+        self._entries[key] = seen_at if seen_at is not None else time.time()
+        self._entries.move_to_end(key)
+        self.expire()
+
+    def expire(self):
+        """Supprime les entrées les plus anciennes (expirées ou au-delà de maxlen)"""
+        limit = time.time() - self.ttl
+        entries = self._entries
+        while entries:
+            key, seen_at = next(iter(entries.items()))
+            if len(entries) <= self.maxlen and seen_at >= limit:
+                break
+            entries.popitem(last=False)
+
+    def items(self):
+        return list(self._entries.items())
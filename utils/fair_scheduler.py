@@ -0,0 +1,78 @@
+import asyncio
+from collections import deque
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+
+class FairScheduler:
+    def __init__(self, max_concurrent: int = 2):
+        """
+        Ordonnanceur asynchrone équitable entre joueurs.
+        - Les opérations d'un même joueur s'exécutent l'une après l'autre, dans l'ordre d'arrivée
+        - Les joueurs sont servis à tour de rôle : un joueur avec beaucoup de demandes ne bloque pas les autres
+        - Les demandes sont mises en attente au lieu d'être refusées
+        - max_concurrent : nombre de joueurs servis en même temps
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self._queues = {}      # clé joueur -> file de (fabrique de coroutine, future)
+        self._ready = deque()  # joueurs ayant une demande en attente et aucune opération en cours
+        self._active = set()   # joueurs dont une opération est en cours
+        self._tasks = set()
+
+    @property
+    def pending(self) -> int:
+        """Nombre de demandes en attente (hors opérations en cours)"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def run(self, key, factory):
+        """
+        Met en file l'opération factory() pour le joueur key et retourne son résultat.
+        factory est une fonction sans argument qui retourne la coroutine à exécuter.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append((factory, future))
+        if key not in self._active and key not in self._ready:
+            self._ready.append(key)
+        if self.pending > self.max_concurrent:
+            logger.info(f"Opération mise en file pour {key} ({self.pending} en attente)")
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        """Lance les opérations suivantes tant qu'il reste de la place, joueur par joueur"""
+        while len(self._active) < self.max_concurrent and self._ready:
+            key = self._ready.popleft()
+            queue = self._queues.get(key)
+            factory, future = queue.popleft()
+            if future.cancelled():
+                # Demandeur parti avant son tour : passer à la suite
+                self._requeue(key)
+                continue
+            self._active.add(key)
+            task = asyncio.create_task(self._execute(key, factory, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _requeue(self, key):
+        """Remet le joueur en fin de tour s'il lui reste des demandes"""
+        if self._queues.get(key):
+            self._ready.append(key)
+        else:
+            self._queues.pop(key, None)
+
+    async def _execute(self, key, factory, future):
+        try:
+            result = await factory()
+            if not future.done():
+                future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._active.discard(key)
+            self._requeue(key)
+            self._dispatch()
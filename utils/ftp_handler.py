@@ -6,6 +6,9 @@ from config.logging_config import setup_logging
 from config.settings import *
 from dotenv import load_dotenv
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from utils.ftp_pool import FTPSessionPool, SESSION_ERRORS
+import asyncio
 import threading
 import shutil
 
@@ -34,6 +37,10 @@ def clear_cache():
     except Exception as e:
         print(f"❌ Erreur lors du nettoyage du cache : {e}")
 
+class FTPTransferCancelled(Exception):
+    """Levée dans le thread FTP quand l'appel asynchrone a été annulé ou a expiré"""
+
+
 class FTPHandler:
     def __init__(self):
         """Initialise la connexion FTP"""
@@ -46,82 +53,179 @@ class FTPHandler:
         if not all([self.host, self.user, self.password]):
             raise ValueError("Informations de connexion FTP manquantes dans le fichier .env")
         
-        self.ftp = None
         self.max_retries = 3
         self.retry_delay = 5  # secondes
-        self._lock = threading.Lock()
         self.timeout = 300  # 5 minutes
+        self.download_blocksize = 256 * 1024  # Taille des blocs écrits sur disque pendant un téléchargement
 
-    def _connect(self):
-        """Établit la connexion FTP avec gestion des erreurs"""
-        with self._lock:
-            for attempt in range(self.max_retries):
-                try:
-                    if self.ftp:
-                        try:
-                            self.ftp.quit()
-                        except:
-                            pass
-                    
-                    self.ftp = ftplib.FTP()
-                    self.ftp.connect(self.host, self.port, timeout=self.timeout)
-                    self.ftp.login(self.user, self.password)
-                    logger.info("Connexion FTP établie avec succès")
-                    return
-                except Exception as e:
-                    logger.error(f"Tentative {attempt + 1}/{self.max_retries} - Erreur lors de la connexion FTP: {e}")
-                    if attempt < self.max_retries - 1:
-                        import time
-                        time.sleep(self.retry_delay)
-                    else:
-                        logger.error("Impossible de se connecter au serveur FTP après plusieurs tentatives")
-                        raise
+        # Sessions persistantes partagées par toutes les méthodes (plus de connexion/login par appel)
+        self.pool = FTPSessionPool(
+            self._connect,
+            max_sessions=int(os.getenv('FTP_MAX_SESSIONS', '2')),
+            keepalive_interval=float(os.getenv('FTP_KEEPALIVE_INTERVAL', '30')),
+            max_idle=float(os.getenv('FTP_MAX_IDLE', '240'))
+        )
+
+        # Exécuteur borné pour les versions asynchrones : ftplib ne bloque jamais la boucle Discord
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.max_sessions, thread_name_prefix="ftp")
+        self.async_timeout = float(os.getenv('FTP_ASYNC_TIMEOUT', '600'))
+        self._call_state = threading.local()  # Événement d'annulation de l'appel en cours dans ce thread
+
+    def _connect(self) -> ftplib.FTP:
+        """Ouvre une nouvelle session FTP authentifiée avec gestion des erreurs"""
+        for attempt in range(self.max_retries):
+            try:
+                ftp = ftplib.FTP()
+                ftp.connect(self.host, self.port, timeout=self.timeout)
+                ftp.login(self.user, self.password)
+                # Mode binaire par défaut : SIZE est refusé en ASCII par certains serveurs
+                ftp.voidcmd('TYPE I')
+                logger.info("Connexion FTP établie avec succès")
+                return ftp
+            except Exception as e:
+                logger.error(f"Tentative {attempt + 1}/{self.max_retries} - Erreur lors de la connexion FTP: {e}")
+                if attempt < self.max_retries - 1:
+                    import time
+                    time.sleep(self.retry_delay)
+                else:
+                    logger.error("Impossible de se connecter au serveur FTP après plusieurs tentatives")
+                    raise
+
+    def _run(self, operation):
+        """
+        Exécute operation(ftp) sur une session du pool.
+        Si la session a été coupée côté serveur, l'opération est rejouée une fois sur une nouvelle session.
+        """
+        try:
+            with self.pool.session() as ftp:
+                return operation(ftp)
+        except SESSION_ERRORS as e:
+            logger.warning(f"Session FTP perdue ({e}), reconnexion transparente")
+        with self.pool.session() as ftp:
+            return operation(ftp)
+
+    async def run_async(self, func, *args, timeout: float = None):
+        """
+        Exécute une fonction FTP bloquante dans l'exécuteur dédié et attend son résultat.
+        En cas d'annulation ou de dépassement du timeout, le transfert en cours est interrompu
+        au prochain bloc reçu et sa session est fermée.
+        """
+        cancel_event = threading.Event()
+
+        def _call():
+            self._call_state.cancel_event = cancel_event
+            try:
+                return func(*args)
+            finally:
+                self._call_state.cancel_event = None
+
+        future = asyncio.get_running_loop().run_in_executor(self._executor, _call)
+        try:
+            return await asyncio.wait_for(future, timeout or self.async_timeout)
+        except asyncio.TimeoutError:
+            cancel_event.set()
+            logger.error(f"Opération FTP {getattr(func, '__name__', func)} interrompue après {timeout or self.async_timeout}s")
+            raise
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+
+    def _guard(self, write):
+        """Enveloppe un callback de transfert pour qu'il s'arrête si l'appel asynchrone a été annulé"""
+        cancel_event = getattr(self._call_state, 'cancel_event', None)
+        if cancel_event is None:
+            return write
+
+        def _write(block):
+            if cancel_event.is_set():
+                raise FTPTransferCancelled("Transfert FTP annulé")
+            write(block)
+        return _write
 
     def test_connection(self) -> bool:
         """Teste la connexion FTP"""
         try:
-            self._connect()
-            self.ftp.quit()
+            self._run(lambda ftp: ftp.voidcmd('NOOP'))
             return True
         except Exception as e:
             logger.error(f"❌ FTP connexion échouée : {e}")
             return False
 
-    def download_file(self, remote_path: str, local_path: str) -> bool:
+    def stream_to_file(self, remote_path: str, local_path: str) -> str:
+        """
+        Télécharge un fichier distant bloc par bloc directement vers local_path.
+        La mémoire utilisée reste constante quelle que soit la taille du fichier.
+        Le fichier n'apparaît à local_path qu'une fois complet (écriture dans un .part puis renommage).
+        Retourne le chemin local, ou None en cas d'erreur.
+        """
+        part_path = local_path + '.part'
         try:
-            self._connect()
-            with open(local_path, 'wb') as f:
-                self.ftp.retrbinary(f'RETR {remote_path}', f.write)
-            self.ftp.quit()
-            return True
+            def _download(ftp):
+                with open(part_path, 'wb') as f:
+                    ftp.retrbinary(f'RETR {remote_path}', self._guard(f.write), blocksize=self.download_blocksize)
+            self._run(_download)
+            os.replace(part_path, local_path)
+            return local_path
         except Exception as e:
-            logger.error(f"❌ Erreur download_file: {e}")
-            return False
+            logger.error(f"❌ Erreur téléchargement de {remote_path} vers {local_path}: {e}")
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            return None
+
+    def download_file(self, remote_path: str, local_path: str) -> bool:
+        return self.stream_to_file(remote_path, local_path) is not None
 
     def read_database(self, remote_path: str) -> bytes:
         """Lire directement la base de données depuis le FTP sans la sauvegarder"""
         try:
-            self._connect()
-            # Créer un fichier temporaire
-            temp = tempfile.NamedTemporaryFile(delete=False)
-            temp_path = temp.name
-            temp.close()
+            # Télécharger directement en mémoire (plus d'aller-retour par un fichier temporaire).
+            # getvalue() réutilise le tampon du BytesIO : les données ne sont présentes qu'une fois en RAM.
+            def _download(ftp):
+                buffer = BytesIO()
+                ftp.retrbinary(f'RETR {remote_path}', self._guard(buffer.write))
+                return buffer.getvalue()
+            return self._run(_download)
 
-            # Télécharger le fichier
-            with open(temp_path, 'wb') as f:
-                self.ftp.retrbinary(f'RETR {remote_path}', f.write)
-            self.ftp.quit()
-
-            # Lire le fichier
-            with open(temp_path, 'rb') as f:
-                data = f.read()
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture base de données: {e}")
+            return None
 
-            # Nettoyer
-            os.remove(temp_path)
-            return data
+    def read_from_offset(self, remote_path: str, offset: int) -> bytes:
+        """Lit un fichier distant à partir d'un offset en octets (commande REST)"""
+        try:
+            def _read(ftp):
+                buffer = BytesIO()
+                ftp.retrbinary(f'RETR {remote_path}', self._guard(buffer.write), rest=offset if offset > 0 else None)
+                return buffer.getvalue()
+            return self._run(_read)
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture de {remote_path} à partir de l'offset {offset}: {e}")
+            return None
 
+    def read_range(self, remote_path: str, offset: int, length: int) -> bytes:
+        """Lit au plus length octets d'un fichier distant à partir d'un offset, sans télécharger la suite"""
+        try:
+            def _read(ftp):
+                chunks = []
+                remaining = length
+                with ftp.transfercmd(f'RETR {remote_path}', rest=offset if offset > 0 else None) as conn:
+                    while remaining > 0:
+                        data = conn.recv(min(self.download_blocksize, remaining))
+                        if not data:
+                            break
+                        chunks.append(data)
+                        remaining -= len(data)
+                # Transfert interrompu volontairement : le serveur peut répondre 426 au lieu de 226
+                try:
+                    ftp.voidresp()
+                except ftplib.error_temp:
+                    pass
+                return b''.join(chunks)
+            return self._run(_read)
         except Exception as e:
-            logger.error(f"❌ Erreur lecture base de données: {e}")
+            logger.error(f"❌ Erreur lecture de {length} octets de {remote_path} à l'offset {offset}: {e}")
             return None
 
     def write_database(self, remote_path: str, data: bytes) -> bool:
@@ -149,45 +253,45 @@ class FTPHandler:
 
     def get_directory_structure(self, path: str = '/') -> dict:
         """Récupère la structure des répertoires"""
-        self._connect()
-        def _walk(cur_path):
-            self.ftp.cwd(cur_path)
-            entries = []
-            self.ftp.retrlines('LIST', entries.append)
-            tree = {}
-            for line in entries:
-                parts = line.split()
-                name = parts[-1]
-                if line.startswith('d'):
-                    tree[name] = _walk(cur_path + '/' + name)
-                else:
-                    size = parts[4]
-                    tree[name] = f"{size} bytes"
-            self.ftp.cwd('..')
-            return tree
-        struct = _walk(path)
-        self.ftp.quit()
-        return struct
-
-    def close(self):
-        """Ferme la connexion FTP"""
-        if self.ftp:
+        def _structure(ftp):
+            def _walk(cur_path):
+                ftp.cwd(cur_path)
+                entries = []
+                ftp.retrlines('LIST', entries.append)
+                tree = {}
+                for line in entries:
+                    parts = line.split()
+                    name = parts[-1]
+                    if line.startswith('d'):
+                        tree[name] = _walk(cur_path + '/' + name)
+                    else:
+                        size = parts[4]
+                        tree[name] = f"{size} bytes"
+                ftp.cwd('..')
+                return tree
+            # La session est réutilisée ensuite : restaurer le répertoire courant et le mode binaire
+            initial_dir = ftp.pwd()
             try:
-                self.ftp.quit()
-                logger.info("Connexion FTP fermée")
-            except:
-                pass
+                return _walk(path)
             finally:
-                self.ftp = None
+                ftp.cwd(initial_dir)
+                ftp.voidcmd('TYPE I')
+        return self._run(_structure)
+
+    def close(self):
+        """Ferme les connexions FTP"""
+        self.pool.close()
+        self._executor.shutdown(wait=False)
+        logger.info("Connexion FTP fermée")
 
     def upload_file(self, local_path, remote_path):
         """Envoie un fichier vers le serveur FTP"""
         try:
-            self._connect()
-            with open(local_path, 'rb') as f:
-                # Augmenter la taille du buffer pour l'upload
-                self.ftp.storbinary(f'STOR {remote_path}', f, blocksize=8192)
-            self.ftp.quit()
+            def _upload(ftp):
+                with open(local_path, 'rb') as f:
+                    # Augmenter la taille du buffer pour l'upload
+                    ftp.storbinary(f'STOR {remote_path}', f, blocksize=8192)
+            self._run(_upload)
             logger.info(f"Fichier {local_path} envoyé avec succès")
             return True
         except Exception as e:
@@ -197,11 +301,12 @@ class FTPHandler:
     def list_files(self, remote_path='.'):
         """Liste les fichiers dans un répertoire FTP"""
         try:
-            self._connect()
-            files = []
-            self.ftp.retrlines(f'LIST {remote_path}', lambda x: files.append(x.split()[-1]))
-            self.ftp.quit()
-            return files
+            def _list(ftp):
+                files = []
+                ftp.retrlines(f'LIST {remote_path}', lambda x: files.append(x.split()[-1]))
+                ftp.voidcmd('TYPE I')  # retrlines repasse la session en ASCII
+                return files
+            return self._run(_list)
         except Exception as e:
             logger.error(f"Erreur lors de la liste des fichiers dans {remote_path}: {e}")
             return []
@@ -209,9 +314,7 @@ class FTPHandler:
     def create_directory(self, remote_path):
         """Crée un répertoire sur le serveur FTP"""
         try:
-            self._connect()
-            self.ftp.mkd(remote_path)
-            self.ftp.quit()
+            self._run(lambda ftp: ftp.mkd(remote_path))
             logger.info(f"Répertoire {remote_path} créé avec succès")
             return True
         except Exception as e:
@@ -221,9 +324,7 @@ class FTPHandler:
     def delete_file(self, remote_path):
         """Supprime un fichier sur le serveur FTP"""
         try:
-            self._connect()
-            self.ftp.delete(remote_path)
-            self.ftp.quit()
+            self._run(lambda ftp: ftp.delete(remote_path))
             logger.info(f"Fichier {remote_path} supprimé avec succès")
             return True
         except Exception as e:
@@ -233,9 +334,7 @@ class FTPHandler:
     def rename_file(self, old_name, new_name):
         """Renomme un fichier sur le serveur FTP"""
         try:
-            self._connect()
-            self.ftp.rename(old_name, new_name)
-            self.ftp.quit()
+            self._run(lambda ftp: ftp.rename(old_name, new_name))
             logger.info(f"Fichier {old_name} renommé en {new_name} avec succès")
             return True
         except Exception as e:
@@ -245,10 +344,7 @@ class FTPHandler:
     def get_file_size(self, remote_path):
         """Récupère la taille d'un fichier sur le serveur FTP"""
         try:
-            self._connect()
-            size = self.ftp.size(remote_path)
-            self.ftp.quit()
-            return size
+            return self._run(lambda ftp: ftp.size(remote_path))
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de la taille du fichier {remote_path}: {e}")
             return None
@@ -256,10 +352,8 @@ class FTPHandler:
     def get_file_modification_time(self, remote_path):
         """Récupère la date de modification d'un fichier sur le serveur FTP"""
         try:
-            self._connect()
             # Utiliser MDTM pour obtenir la date de modification
-            response = self.ftp.sendcmd(f'MDTM {remote_path}')
-            self.ftp.quit()
+            response = self._run(lambda ftp: ftp.sendcmd(f'MDTM {remote_path}'))
             if response.startswith('213'):
                 # Format: 213 YYYYMMDDHHMMSS
                 timestamp = response[4:].strip()
@@ -267,4 +361,55 @@ class FTPHandler:
             return None
         except Exception as e:
             logger.error(f"Erreur lors de la récupération de la date de modification du fichier {remote_path}: {e}")
-            return None 
\ No newline at end of file
+            return None
+
+    def get_file_fingerprint(self, remote_path):
+        """Récupère l'empreinte (taille, date de modification) d'un fichier en une seule session FTP"""
+        try:
+            def _fingerprint(ftp):
+                size = ftp.size(remote_path)
+                response = ftp.sendcmd(f'MDTM {remote_path}')
+                mdtm = response[4:].strip() if response.startswith('213') else None
+                return size, mdtm
+            return self._run(_fingerprint)
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération de l'empreinte du fichier {remote_path}: {e}")
+            return None
+
+    # Versions asynchrones : mêmes résultats que les méthodes synchrones, sans bloquer la boucle asyncio
+
+    async def test_connection_async(self) -> bool:
+        return await self.run_async(self.test_connection)
+
+    async def download_file_async(self, remote_path: str, local_path: str) -> bool:
+        return await self.run_async(self.download_file, remote_path, local_path)
+
+    async def stream_to_file_async(self, remote_path: str, local_path: str) -> str:
+        return await self.run_async(self.stream_to_file, remote_path, local_path)
+
+    async def read_database_async(self, remote_path: str) -> bytes:
+        return await self.run_async(self.read_database, remote_path)
+
+    async def read_from_offset_async(self, remote_path: str, offset: int) -> bytes:
+        return await self.run_async(self.read_from_offset, remote_path, offset)
+
+    async def read_range_async(self, remote_path: str, offset: int, length: int) -> bytes:
+        return await self.run_async(self.read_range, remote_path, offset, length)
+
+    async def write_database_async(self, remote_path: str, data: bytes) -> bool:
+        return await self.run_async(self.write_database, remote_path, data)
+
+    async def upload_file_async(self, local_path, remote_path) -> bool:
+        return await self.run_async(self.upload_file, local_path, remote_path)
+
+    async def list_files_async(self, remote_path='.'):
+        return await self.run_async(self.list_files, remote_path)
+
+    async def get_file_size_async(self, remote_path):
+        return await self.run_async(self.get_file_size, remote_path)
+
+    async def get_file_modification_time_async(self, remote_path):
+        return await self.run_async(self.get_file_modification_time, remote_path)
+
+    async def get_file_fingerprint_async(self, remote_path):
+        return await self.run_async(self.get_file_fingerprint, remote_path)
@@ -0,0 +1,142 @@
+import ftplib
+import threading
+import time
+from contextlib import contextmanager
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Erreurs qui signifient que la session FTP n'est plus utilisable
+SESSION_ERRORS = (ftplib.error_temp, ftplib.error_proto, ftplib.error_reply, EOFError, OSError)
+
+
+class FTPSessionPool:
+    def __init__(self, connect, max_sessions: int = 2, keepalive_interval: float = 30, max_idle: float = 240):
+        """
+        Pool de sessions FTP authentifiées réutilisées entre les appels.
+        - connect : fonction qui retourne une session ftplib.FTP connectée et authentifiée
+        - max_sessions : nombre maximum de sessions ouvertes en même temps
+        - keepalive_interval : au-delà de ce temps d'inactivité, la session est vérifiée par un NOOP
+        - max_idle : au-delà de ce temps d'inactivité, la session est fermée plutôt que réutilisée
+        """
+        self._connect = connect
+        self.max_sessions = max_sessions
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_sessions)
+        self._idle = []  # [(session, dernière utilisation)]
+        self._keepalive_thread = None
+        self._closed = False
+
+    def _quit(self, ftp):
+        """Ferme proprement une session (sans lever d'erreur)"""
+        try:
+            ftp.quit()
+        except Exception:
+            try:
+                ftp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, ftp) -> bool:
+        """Vérifie qu'une session répond encore (NOOP)"""
+        try:
+            ftp.voidcmd('NOOP')
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        """Récupère une session saine du pool ou en ouvre une nouvelle"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                ftp, last_used = self._idle.pop()
+            idle_time = time.monotonic() - last_used
+            if idle_time > self.max_idle:
+                self._quit(ftp)
+                continue
+            if idle_time > self.keepalive_interval and not self._is_alive(ftp):
+                logger.info("Session FTP expirée, ouverture d'une nouvelle session")
+                self._quit(ftp)
+                continue
+            return ftp
+        return self._connect()
+
+    def _checkin(self, ftp):
+        """Remet une session dans le pool après usage"""
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_sessions:
+                self._idle.append((ftp, time.monotonic()))
+                ftp = None
+        if ftp is not None:
+            self._quit(ftp)
+            return
+        self._start_keepalive()
+
+    @contextmanager
+    def session(self):
+        """Emprunte une session du pool pour la durée du bloc"""
+        self._slots.acquire()
+        ftp = None
+        try:
+            ftp = self._checkout()
+            yield ftp
+        except ftplib.error_perm:
+            # Erreur applicative (fichier introuvable, droits...) : la session reste valide
+            raise
+        except BaseException:
+            # Erreur réseau ou transfert interrompu : la session n'est plus fiable
+            if ftp is not None:
+                self._quit(ftp)
+                ftp = None
+            raise
+        finally:
+            if ftp is not None:
+                self._checkin(ftp)
+            self._slots.release()
+
+    def keepalive(self):
+        """Envoie un NOOP aux sessions inactives et ferme celles qui ne répondent plus"""
+        with self._lock:
+            sessions = self._idle
+            self._idle = []
+        now = time.monotonic()
+        alive = []
+        for ftp, last_used in sessions:
+            if now - last_used > self.max_idle or not self._is_alive(ftp):
+                self._quit(ftp)
+            else:
+                alive.append((ftp, last_used))
+        with self._lock:
+            self._idle.extend(alive)
+            surplus = self._idle[self.max_sessions:]
+            del self._idle[self.max_sessions:]
+        for ftp, _ in surplus:
+            self._quit(ftp)
+
+    def _keepalive_loop(self):
+        while not self._closed:
+            time.sleep(self.keepalive_interval)
+            try:
+                self.keepalive()
+            except Exception as e:
+                logger.error(f"Erreur lors du keepalive FTP: {e}")
+
+    def _start_keepalive(self):
+        """Démarre le thread de keepalive au premier usage"""
+        if self._keepalive_thread is None and self.keepalive_interval > 0:
+            self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name="ftp-keepalive", daemon=True)
+            self._keepalive_thread.start()
+
+    def close(self):
+        """Ferme toutes les sessions inactives du pool"""
+        with self._lock:
+            self._closed = True
+            sessions = self._idle
+            self._idle = []
+        for ftp, _ in sessions:
+            self._quit(ftp)
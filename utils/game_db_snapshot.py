@@ -0,0 +1,249 @@
+import asyncio
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import time
+from config.logging_config import setup_logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = setup_logging()
+
+# Préfixe des copies locales (nettoyées aussi par utils.ftp_handler.clear_cache)
+SNAPSHOT_PREFIX = "conan_db_"
+
+
+class SnapshotHandle:
+    """Accès en lecture seule à une génération de game.db"""
+
+    def __init__(self, snapshot, path, generation, fingerprint):
+        self._snapshot = snapshot
+        self.path = path
+        self.generation = generation
+        self.fingerprint = fingerprint
+        self._connections = []
+        self._released = False
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Ouvre une connexion SQLite en lecture seule sur la copie locale.
+        La copie ne change jamais (immutable=1, pas de verrous) et est lue via mmap
+        plutôt que copiée dans le cache de pages de chaque connexion.
+        """
+        uri = pathlib.Path(self.path).resolve().as_uri() + "?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.execute(f"PRAGMA mmap_size = {self._snapshot.mmap_size}")
+        self._connections.append(conn)
+        return conn
+
+    def release(self):
+        """Ferme les connexions ouvertes et libère la génération"""
+        if self._released:
+            return
+        self._released = True
+        for conn in self._connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._connections = []
+        self._snapshot._release(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class GameDBSnapshot:
+    def __init__(self, ftp_handler, remote_path: str = None, max_age: float = None, conditional: bool = None):
+        """
+        Service unique de téléchargement de game.db.
+        Tous les consommateurs qui demandent la base pendant la même génération
+        partagent la même copie locale au lieu de la retélécharger.
+        """
+        self.ftp = ftp_handler
+        self.remote_path = remote_path or os.getenv('FTP_GAME_DB', 'ConanSandbox/Saved/game.db')
+        # Durée (en secondes) pendant laquelle une génération est servie sans interroger le FTP
+        self.max_age = max_age if max_age is not None else float(os.getenv('GAME_DB_SNAPSHOT_MAX_AGE', '10'))
+        # Mode conditionnel : ne retélécharger que si l'empreinte distante (SIZE/MDTM) a changé
+        self.conditional = conditional if conditional is not None else os.getenv('GAME_DB_CONDITIONAL_FETCH', '1') != '0'
+        # Taille maximale projetée en mémoire par connexion (SQLite la plafonne à ~2 Go)
+        self.mmap_size = int(os.getenv('GAME_DB_MMAP_SIZE', str(1024 * 1024 * 1024)))
+
+        self.generation = 0
+        self.fingerprint = None  # (taille, MDTM) de la version distante téléchargée
+        self.local_path = None
+        self.checked_at = 0  # Dernière vérification de la version distante
+        self.skipped_downloads = 0  # Téléchargements évités grâce à l'empreinte
+
+        # _lock protège uniquement l'état publié (génération courante, handles) et n'est tenu que brièvement ;
+        # _download_lock sérialise les rafraîchissements, transfert FTP et préparation compris
+        self._lock = threading.Lock()
+        self._download_lock = threading.Lock()
+        self._readers = {}  # chemin local -> nombre de handles actifs
+        self._retired = set()  # anciennes générations à supprimer dès qu'elles sont libérées
+        self._refresh_future = None  # Rafraîchissement asynchrone en cours, partagé par les appelants concurrents
+        self._prepare_hooks = []  # fonctions(chemin) appliquées à chaque nouvelle copie avant sa publication
+
+    def add_prepare_hook(self, hook):
+        """
+        Enregistre une fonction appelée avec le chemin de chaque nouvelle copie, avant sa publication
+        (ex : création d'index). C'est le seul moment où la copie peut être modifiée.
+        """
+        if hook not in self._prepare_hooks:
+            self._prepare_hooks.append(hook)
+
+    def _prepare(self, path):
+        for hook in self._prepare_hooks:
+            try:
+                hook(path)
+            except Exception as e:
+                logger.error(f"Erreur lors de la préparation du snapshot {path}: {e}")
+
+    def _remote_fingerprint(self):
+        """Récupère l'empreinte (SIZE, MDTM) du fichier distant"""
+        return self.ftp.get_file_fingerprint(self.remote_path)
+
+    def _is_unchanged(self, fingerprint) -> bool:
+        """Vérifie si la version distante correspond à la génération courante"""
+        if not self.conditional or self.local_path is None:
+            return False
+        # Une empreinte incomplète (commande non supportée, erreur) force le téléchargement
+        if not fingerprint or None in fingerprint:
+            return False
+        return fingerprint == self.fingerprint
+
+    def _clear_stale_copies(self):
+        """
+        Supprime les copies (et les .part interrompus) laissées par une exécution précédente,
+        avant le premier téléchargement du processus
+        """
+        temp_dir = tempfile.gettempdir()
+        for name in os.listdir(temp_dir):
+            if name.startswith(SNAPSHOT_PREFIX):
+                try:
+                    os.remove(os.path.join(temp_dir, name))
+                    logger.info(f"Ancien snapshot supprimé : {name}")
+                except OSError as e:
+                    logger.warning(f"Impossible de supprimer l'ancien snapshot {name}: {e}")
+
+    def _download(self, fingerprint) -> bool:
+        """Télécharge une nouvelle génération et la publie (appelé sous _download_lock, hors de _lock)"""
+        # Téléchargement en flux directement vers l'emplacement définitif du snapshot :
+        # la base n'est jamais chargée entièrement en mémoire
+        if self.generation == 0:
+            self._clear_stale_copies()
+        generation = self.generation + 1
+        path = os.path.join(tempfile.gettempdir(), f"{SNAPSHOT_PREFIX}{os.getpid()}_{generation}.db")
+        if self.ftp.stream_to_file(self.remote_path, path) is None:
+            logger.error(f"Impossible de télécharger {self.remote_path}")
+            return False
+
+        self._prepare(path)
+        self._publish(path, generation, fingerprint)
+        logger.info(f"Snapshot game.db génération {generation} ({os.path.getsize(path)} octets, empreinte {fingerprint})")
+        return True
+
+    def _publish(self, path, generation, fingerprint):
+        """Remplace la génération courante par une nouvelle copie locale"""
+        with self._lock:
+            previous = self.local_path
+            self.local_path = path
+            self.generation = generation
+            self.fingerprint = fingerprint
+            self.checked_at = time.time()
+            if previous and previous != path:
+                self._retired.add(previous)
+                self._cleanup(previous)
+
+    def _cleanup(self, path):
+        """Supprime une génération retirée si plus aucun handle ne l'utilise"""
+        if path in self._retired and not self._readers.get(path):
+            self._retired.discard(path)
+            self._readers.pop(path, None)
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Impossible de supprimer l'ancien snapshot {path}: {e}")
+
+    def _release(self, path):
+        with self._lock:
+            self._readers[path] = max(0, self._readers.get(path, 0) - 1)
+            self._cleanup(path)
+
+    def is_fresh(self) -> bool:
+        """Indique si la génération courante peut encore être servie telle quelle"""
+        return self.local_path is not None and time.time() - self.checked_at < self.max_age
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Télécharge une nouvelle génération si la courante a expiré et que le fichier distant a changé.
+        Retourne True si une copie est disponible.
+        Les lecteurs (acquire) ne sont jamais bloqués par un téléchargement en cours :
+        ils continuent de lire la génération courante jusqu'à la publication de la suivante.
+        """
+        with self._download_lock:
+            if not force and self.is_fresh():
+                return True
+            try:
+                fingerprint = self._remote_fingerprint()
+                if not force and self._is_unchanged(fingerprint):
+                    # game.db n'a pas été réécrit par le serveur : la génération courante reste valide
+                    with self._lock:
+                        self.checked_at = time.time()
+                    self.skipped_downloads += 1
+                    logger.debug(f"game.db inchangé ({fingerprint}), génération {self.generation} conservée")
+                    return True
+                self._download(fingerprint)
+            except Exception as e:
+                logger.error(f"Erreur lors du rafraîchissement du snapshot game.db: {e}")
+            return self.local_path is not None
+
+    async def refresh_async(self, force: bool = False) -> bool:
+        """
+        Version asynchrone de refresh : le téléchargement s'exécute hors de la boucle asyncio.
+        Les appelants concurrents attendent le même rafraîchissement au lieu d'occuper chacun
+        un thread FTP bloqué sur _download_lock pendant tout le transfert.
+        """
+        if not force and self.is_fresh():
+            return True
+        if self._refresh_future is None or self._refresh_future.done():
+            self._refresh_future = asyncio.ensure_future(self.ftp.run_async(self.refresh, force))
+        # shield : l'annulation d'un appelant n'interrompt pas le téléchargement attendu par les autres
+        return await asyncio.shield(self._refresh_future)
+
+    async def acquire_async(self, force: bool = False):
+        """Version asynchrone de acquire"""
+        if not await self.refresh_async(force):
+            return None
+        return self.acquire(refresh=False)
+
+    def acquire(self, force: bool = False, refresh: bool = True):
+        """
+        Retourne un SnapshotHandle sur la génération courante (None si aucune copie n'est disponible).
+        Avec refresh=False, aucune opération FTP n'est faite (la copie a été rafraîchie via refresh_async).
+        """
+        if refresh and not self.refresh(force=force):
+            return None
+        with self._lock:
+            if self.local_path is None:
+                return None
+            self._readers[self.local_path] = self._readers.get(self.local_path, 0) + 1
+            return SnapshotHandle(self, self.local_path, self.generation, self.fingerprint)
+
+    def close(self):
+        """Supprime toutes les copies locales non utilisées"""
+        with self._lock:
+            if self.local_path:
+                self._retired.add(self.local_path)
+                path = self.local_path
+                self.local_path = None
+                self._cleanup(path)
+            for path in list(self._retired):
+                self._cleanup(path)
@@ -0,0 +1,65 @@
+import re
+from collections import namedtuple
+
+# Événements extraits de ConanSandbox.log (timestamp = "2025.06.01-17.57.38:972")
+ChatEvent = namedtuple('ChatEvent', ['timestamp', 'char_name', 'uid', 'steam_id', 'message'])
+KillEvent = namedtuple('KillEvent', ['timestamp', 'killer_name', 'killer_uid', 'victim_name', 'victim_uid'])
+LoginEvent = namedtuple('LoginEvent', ['timestamp', 'player_name'])
+LogoutEvent = namedtuple('LogoutEvent', ['timestamp', 'player_name'])
+
+# Préfixe commun : [2025.06.01-17.57.38:972][555]Catégorie: reste de la ligne
+_LINE = re.compile(r'\[([^\]]+)\]\[\s*\d+\](\w+):\s?(.*)')
+
+# Format : ChatWindow: Character pago-fraise (uid 12364, player 76561198276177053) said: message
+_CHAT = re.compile(r'Character ([^()]+) \(uid (\d+), player (\d+)\) said: (.+)')
+# Format : LogKill: Killer: pago-fraise (uid 12364) killed Victim: victime-name (uid 56789)
+_KILL = re.compile(r'Killer: ([^()]+) \(uid (\d+)\) killed Victim: ([^()]+) \(uid (\d+)\)')
+# Format : LogNet: Join succeeded: pago-fraise
+_LOGIN = re.compile(r'Join succeeded: (.+)')
+# Format : LogNet: Player disconnected: pago-fraise
+_LOGOUT = re.compile(r'Player disconnected: (.+)')
+
+
+def _chat(timestamp, match):
+    char_name, uid, steam_id, message = match.groups()
+    return ChatEvent(timestamp, char_name.strip(), uid, steam_id, message.strip())
+
+
+def _kill(timestamp, match):
+    killer_name, killer_uid, victim_name, victim_uid = match.groups()
+    return KillEvent(timestamp, killer_name.strip(), killer_uid, victim_name.strip(), victim_uid)
+
+
+# Catégorie de log -> [(expression, constructeur d'événement)]
+_HANDLERS = {
+    'ChatWindow': [(_CHAT, _chat)],
+    'LogKill': [(_KILL, _kill)],
+    'LogNet': [
+        (_LOGIN, lambda timestamp, match: LoginEvent(timestamp, match.group(1).strip())),
+        (_LOGOUT, lambda timestamp, match: LogoutEvent(timestamp, match.group(1).strip())),
+    ],
+}
+
+
+def parse_event(line):
+    """Retourne l'événement correspondant à une ligne de log (None si la ligne n'est pas suivie)"""
+    match = _LINE.match(line)
+    if not match:
+        return None
+    handlers = _HANDLERS.get(match.group(2))
+    if not handlers:
+        return None
+    timestamp, rest = match.group(1), match.group(3)
+    for pattern, build in handlers:
+        found = pattern.search(rest)
+        if found:
+            return build(timestamp, found)
+    return None
+
+
+def extract_events(lines):
+    """Parcourt les lignes une seule fois et produit les événements reconnus, dans l'ordre du log"""
+    for line in lines:
+        event = parse_event(line)
+        if event is not None:
+            yield event
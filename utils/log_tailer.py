@@ -0,0 +1,134 @@
+import hashlib
+import re
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Octets du début du fichier utilisés pour reconnaître un log déjà lu (le log change à chaque redémarrage du serveur)
+HEAD_BYTES = 1024
+
+# Horodatage en tête de ligne : [2025.06.01-17.57.38:972]
+_LINE_TIMESTAMP = re.compile(rb'\[([^\]]+)\]')
+
+
+class LogTailer:
+    def __init__(self, ftp_handler, remote_path: str, offset: int = 0, cursor_store=None):
+        """
+        Lecteur incrémental d'un fichier de log distant.
+        Mémorise l'offset déjà lu et ne télécharge que les nouveaux octets (REST).
+        Avec cursor_store (DatabaseLogCursor), la position est sauvegardée par checkpoint()
+        et reprise au redémarrage si le fichier distant est toujours le même.
+        """
+        self.ftp = ftp_handler
+        self.remote_path = remote_path
+        self.offset = offset  # Nombre d'octets déjà lus dans le fichier distant
+        self.remote_size = None  # Dernière taille distante observée
+        self.last_line_ts = None  # Horodatage de la dernière ligne complète lue
+        self.head_hash = None  # Empreinte des HEAD_BYTES premiers octets du fichier
+        self._partial = b''  # Dernière ligne incomplète, complétée au prochain passage
+        self.cursor_store = cursor_store
+        self._restored = cursor_store is None
+
+    def reset(self, offset: int = 0):
+        """Repart d'un offset donné (0 = début du fichier)"""
+        self.offset = offset
+        self._partial = b''
+        self.head_hash = None
+
+    def _read_head_hash(self):
+        """Calcule l'empreinte du début du fichier distant (None si le fichier est encore trop court)"""
+        head = self.ftp.read_range(self.remote_path, 0, HEAD_BYTES)
+        if not head or len(head) < HEAD_BYTES:
+            return None
+        return hashlib.sha1(head).hexdigest()
+
+    def _restore(self, size):
+        """Reprend la position sauvegardée si le fichier distant est celui qui était en cours de lecture"""
+        self._restored = True
+        cursor = self.cursor_store.get_cursor(self.remote_path)
+        if not cursor:
+            return
+        offset, last_line_ts, saved_size, head_hash = cursor
+        if size < offset:
+            logger.info(f"Log {self.remote_path} plus court que le point de reprise, relecture depuis le début")
+            return
+        # Même début de fichier : c'est le même log, qui a seulement grandi depuis
+        if head_hash and self._read_head_hash() != head_hash:
+            logger.info(f"Log {self.remote_path} remplacé depuis le dernier arrêt, relecture depuis le début")
+            return
+        self.offset = offset
+        self.last_line_ts = last_line_ts
+        self.head_hash = head_hash
+        logger.info(f"Reprise de {self.remote_path} à l'offset {offset} (dernière ligne {last_line_ts})")
+
+    def read_new_lines(self) -> list[str]:
+        """Retourne les lignes complètes ajoutées au log depuis le dernier appel"""
+        size = self.ftp.get_file_size(self.remote_path)
+        if size is None:
+            return []
+        self.remote_size = size
+
+        if not self._restored:
+            self._restore(size)
+
+        # Fichier plus petit que l'offset : le log a été tronqué ou remplacé (redémarrage du serveur)
+        if size < self.offset:
+            logger.warning(f"Log {self.remote_path} tronqué ou remplacé ({size} < {self.offset} octets), relecture depuis le début")
+            self.reset()
+
+        if size == self.offset:
+            return []
+
+        start = self.offset
+        data = self.ftp.read_from_offset(self.remote_path, self.offset)
+        if not data:
+            return []
+        self.offset += len(data)
+
+        # Empreinte du fichier, calculée dès que son début a été lu
+        if self.head_hash is None and start == 0 and len(data) >= HEAD_BYTES:
+            self.head_hash = hashlib.sha1(data[:HEAD_BYTES]).hexdigest()
+
+        # Découper en lignes en gardant la dernière si elle n'est pas terminée
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        for line in reversed(lines):
+            match = _LINE_TIMESTAMP.match(line)
+            if match:
+                self.last_line_ts = match.group(1).decode('ascii', errors='ignore')
+                break
+        return [line.rstrip(b'\r').decode('utf-8', errors='ignore') for line in lines]
+
+    async def read_new_lines_async(self) -> list[str]:
+        """Version asynchrone de read_new_lines (SIZE et REST exécutés hors de la boucle asyncio)"""
+        return await self.ftp.run_async(self.read_new_lines)
+
+    def _checkpoint_state(self):
+        """Retourne la position à sauvegarder (None si rien à sauvegarder) ; peut lire le début du log par FTP"""
+        if self.cursor_store is None or not self._restored:
+            return None
+        # La dernière ligne incomplète sera relue au redémarrage
+        offset = self.offset - len(self._partial)
+        if self.head_hash is None and offset >= HEAD_BYTES:
+            self.head_hash = self._read_head_hash()
+        return self.remote_path, offset, self.last_line_ts, self.remote_size, self.head_hash
+
+    def checkpoint(self):
+        """Sauvegarde la position des lignes déjà traitées (à appeler une fois les lignes traitées)"""
+        state = self._checkpoint_state()
+        if state:
+            self.cursor_store.save_cursor(*state)
+
+    async def checkpoint_async(self):
+        """
+        Version asynchrone de checkpoint : l'empreinte éventuelle est lue sur un thread FTP,
+        la position est enregistrée par le thread d'écriture unique de discord.db
+        """
+        if self.cursor_store is None or not self._restored:
+            return
+        if self.head_hash is None:
+            state = await self.ftp.run_async(self._checkpoint_state)
+        else:
+            state = self._checkpoint_state()
+        if state:
+            await self.cursor_store.save_cursor_async(*state)
@@ -0,0 +1,90 @@
+import json
+from collections import namedtuple
+
+# Noms de colonnes de ListPlayers (en minuscules) -> champ de PlayerRecord
+_COLUMNS = {
+    'idx': 'conid',
+    'char name': 'char_name',
+    'player name': 'player_name',
+    'user id': 'user_id',
+    'platform id': 'platform_id',
+    'steam id': 'platform_id',
+    'platform name': 'platform_name',
+}
+
+# Ordre des colonnes quand la réponse n'a pas d'en-tête
+_DEFAULT_ORDER = ('conid', 'char_name', 'player_name', 'user_id', 'platform_id', 'platform_name')
+
+
+class PlayerRecord(namedtuple('PlayerRecord', _DEFAULT_ORDER)):
+    """Un joueur connecté : conid (index temporaire), personnage, compte et identifiants"""
+    __slots__ = ()
+
+    @property
+    def steam_id(self):
+        """Identifiant Steam du joueur (Platform ID pour les joueurs Steam)"""
+        if self.platform_id and (not self.platform_name or self.platform_name.lower() == 'steam'):
+            return self.platform_id
+        return None
+
+    @property
+    def ids(self):
+        """Identifiants permettant de retrouver le joueur (User ID et Platform ID)"""
+        return tuple(player_id for player_id in (self.user_id, self.platform_id) if player_id)
+
+
+def _split(line):
+    return [part.strip() for part in line.split('|')]
+
+
+def parse_list_players(resp: str) -> list:
+    """Analyse la réponse tabulaire de ListPlayers en s'appuyant sur la ligne d'en-tête"""
+    order = _DEFAULT_ORDER
+    records = []
+    for line in (resp or '').splitlines():
+        if '|' not in line:
+            continue  # Ligne vide ou message du serveur
+        parts = _split(line)
+        if not parts[0].isdigit():
+            # Ligne d'en-tête : retenir la position de chaque colonne connue
+            header = [_COLUMNS.get(part.lower()) for part in parts]
+            if 'conid' in header:
+                order = header
+            continue
+        fields = dict.fromkeys(_DEFAULT_ORDER, '')
+        for field, value in zip(order, parts):
+            if field:
+                fields[field] = value
+        records.append(PlayerRecord(**fields))
+    return records
+
+
+def parse_get_player_list(resp: str) -> list:
+    """Analyse la réponse JSON de GetPlayerList ({"players": [{"playerId", "name", "charName", ...}]})"""
+    json_str = (resp or '').strip()
+    if json_str.startswith("Command 'GetPlayerList' succeeded!"):
+        json_str = json_str.replace("Command 'GetPlayerList' succeeded!", "").strip()
+    players = json.loads(json_str).get('players')
+    if not isinstance(players, list):
+        return []
+    records = []
+    for idx, player in enumerate(players):
+        records.append(PlayerRecord(
+            conid=str(player.get('conid', player.get('idx', idx))),
+            char_name=player.get('charName') or '',
+            player_name=player.get('name') or '',
+            user_id=str(player.get('playerId') or ''),
+            platform_id=str(player.get('platformId') or player.get('steamId') or ''),
+            platform_name=player.get('platformName') or '',
+        ))
+    return records
+
+
+def parse_player_list(resp: str) -> list:
+    """Analyse une réponse de GetPlayerList (JSON) ou de ListPlayers (tableau)"""
+    if resp and '{' in resp:
+        try:
+            return parse_get_player_list(resp)
+        except (ValueError, AttributeError):
+            pass
+    return parse_list_players(resp)
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import deque
+from config.logging_config import setup_logging
+
+logger = setup_logging()
+
+# Priorités des demandes (la plus petite valeur passe en premier)
+PRIORITY_HIGH = 0    # Commandes déclenchées par un joueur (achat, starter pack...)
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # Tâches de fond (liste des joueurs, synchronisations...)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, min_rate: float = None,
+                 backoff_factor: float = 0.5, recovery_step: float = None):
+        """
+        Limiteur de débit asynchrone par seau à jetons.
+        - rate : nombre de jetons regagnés par seconde (débit soutenu)
+        - burst : nombre maximum de jetons accumulés (rafale autorisée)
+        - min_rate : débit plancher atteint après des rejets successifs du serveur
+        - backoff_factor : facteur appliqué au débit quand le serveur refuse une commande
+        - recovery_step : débit regagné après chaque commande acceptée
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self.backoff_factor = backoff_factor
+        self.recovery_step = recovery_step if recovery_step is not None else rate / 10
+
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._queues = {priority: deque() for priority in (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)}
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _head(self):
+        """Retourne le prochain demandeur à servir (priorité la plus haute, puis ordre d'arrivée)"""
+        for priority in sorted(self._queues):
+            if self._queues[priority]:
+                return self._queues[priority][0]
+        return None
+
+    @property
+    def waiting(self) -> int:
+        """Nombre de demandes en attente d'un jeton"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL):
+        """Attend qu'un jeton soit disponible, sans bloquer la boucle asyncio"""
+        waiter = asyncio.Event()
+        queue = self._queues.get(priority, self._queues[PRIORITY_NORMAL])
+        queue.append(waiter)
+        try:
+            while True:
+                delay = None  # Pas en tête de file : attendre d'être réveillé
+                if self._head() is waiter:
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+                waiter.clear()
+                try:
+                    await asyncio.wait_for(waiter.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            queue.remove(waiter)
+            head = self._head()
+            if head is not None:
+                head.set()
+
+    def penalize(self):
+        """Le serveur a refusé une commande : vider le seau et réduire le débit"""
+        self._refill()
+        self._tokens = 0
+        self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+        logger.warning(f"Limite du serveur atteinte, débit réduit à {self.rate:.2f} commande(s)/s")
+
+    def record_success(self):
+        """Commande acceptée : remonter progressivement vers le débit nominal"""
+        if self.rate < self.max_rate:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
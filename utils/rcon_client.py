@@ -1,32 +1,45 @@
 # rcon.py
 
-import socket, struct, os, threading
+import struct, os
 from dotenv import load_dotenv
 import logging
 import asyncio
-import time
-import json
+from utils.player_list_parser import parse_player_list
+from utils.rate_limiter import TokenBucket, PRIORITY_NORMAL, PRIORITY_LOW
 
 # Utiliser le logger configuré dans bot.py
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Types de paquets du protocole Source RCON
+SERVERDATA_AUTH = 3
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+
+# Plus grand identifiant de requête (int32 signé) avant de reboucler
+MAX_REQUEST_ID = 2 ** 31 - 1
+
 class RCONClient:
     DEFAULT_TIMEOUT = 10.0  # Timeout par défaut en secondes
-    
+
     def __init__(self, timeout: float = None, max_retries: int = 3):
         self.host = os.getenv('GAME_SERVER_HOST')
         self.port = int(os.getenv('RCON_PORT'))
         self.password = os.getenv('RCON_PASSWORD')
         self.max_retries = max_retries
         self.retries = 0
-        self.sock = None
+        self.reader = None
+        self.writer = None
         self.event_callbacks = []  # Liste des callbacks pour les événements
         self.connected = False
-        self.last_command_time = 0  # Timestamp de la dernière commande
-        self.min_command_interval = 2.0  # Intervalle minimum entre les commandes (en secondes)
-        
+
+        # Budget de commandes du serveur : débit soutenu (commandes/s) et rafale autorisée
+        self.limiter = TokenBucket(
+            rate=float(os.getenv('RCON_RATE', '0.5')),
+            burst=int(os.getenv('RCON_BURST', '3'))
+        )
+
         # Vérifier que les variables d'environnement sont définies
         if not self.host:
             raise ValueError("GAME_SERVER_HOST n'est pas défini dans .env")
@@ -34,175 +47,209 @@ class RCONClient:
             raise ValueError("RCON_PORT n'est pas défini dans .env")
         if not self.password:
             raise ValueError("RCON_PASSWORD n'est pas défini dans .env")
-        
+
         # Utiliser le timeout par défaut si aucun n'est fourni
         self.timeout = timeout or self.DEFAULT_TIMEOUT
-        
-        # Initialiser la connexion
-        self._connect()
 
-    def _connect(self):
+        # Multiplexage : chaque requête a un identifiant unique et attend sa réponse dans cette table
+        self._last_request_id = 0
+        self._pending = {}  # request_id -> Future de la réponse
+        self._auth_request_id = None
+        self._read_task = None
+        self._connect_lock = asyncio.Lock()
+
+        # La connexion est établie au premier appel, dans la boucle asyncio du bot
+
+    def _next_request_id(self) -> int:
+        """Retourne un identifiant de requête croissant (jamais -1, qui signale un échec d'authentification)"""
+        self._last_request_id = self._last_request_id % MAX_REQUEST_ID + 1
+        return self._last_request_id
+
+    async def _connect(self):
         """Tente de se connecter au serveur RCON avec gestion des reconnexions"""
-        try:
-            if self.sock:
-                try:
-                    self.sock.close()
-                except:
-                    pass
-                self.sock = None
-            
-            # Vérifier la connexion avant de continuer
-            if not self.sock:
-                self.sock = socket.create_connection((self.host, self.port), self.timeout)
-            
-            # Authentification
-            if not self._auth():
-                raise RuntimeError("Authentification RCON échouée")
-            
-            self.retries = 0
-            self.connected = True
-            logger.info(f"Connexion RCON réussie après {self.retries} tentatives")
-            
-        except (socket.timeout, ConnectionRefusedError, ConnectionResetError, BrokenPipeError) as e:
-            self.connected = False
-            if self.retries < self.max_retries:
-                self.retries += 1
-                logger.warning(f"Échec de la connexion RCON (tentative {self.retries}/{self.max_retries}): {str(e)}")
-                time.sleep(5)
-                self._connect()
-            else:
-                raise RuntimeError(f"Impossible de se connecter après {self.max_retries} tentatives: {str(e)}")
-        except Exception as e:
-            self.connected = False
-            logger.error(f"Erreur inattendue lors de la connexion RCON: {str(e)}")
-            raise RuntimeError(f"Erreur lors de la connexion RCON: {str(e)}")
+        self.retries = 0
+        while True:
+            try:
+                await self._close_transport()
+
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+                self._read_task = asyncio.create_task(self._read_loop())
+
+                # Authentification
+                if not await self._auth():
+                    raise RuntimeError("Authentification RCON échouée")
 
-    def _ensure_connection(self):
+                self.connected = True
+                logger.info(f"Connexion RCON réussie après {self.retries} tentatives")
+                return
+
+            except (asyncio.TimeoutError, ConnectionError, OSError) as e:
+                self.connected = False
+                if self.retries < self.max_retries:
+                    self.retries += 1
+                    logger.warning(f"Échec de la connexion RCON (tentative {self.retries}/{self.max_retries}): {str(e)}")
+                    await asyncio.sleep(5)
+                else:
+                    raise RuntimeError(f"Impossible de se connecter après {self.max_retries} tentatives: {str(e)}")
+            except Exception as e:
+                self.connected = False
+                await self._close_transport()
+                logger.error(f"Erreur inattendue lors de la connexion RCON: {str(e)}")
+                raise RuntimeError(f"Erreur lors de la connexion RCON: {str(e)}")
+
+    async def _ensure_connection(self):
         """Assure que la connexion est active avant d'envoyer une commande"""
-        if not self.connected or not self.sock:
-            self._connect()
-            if not self.connected:
-                raise RuntimeError("Impossible de se connecter au serveur RCON")
-
-    def _rate_limit_check(self):
-        """Vérifie et respecte le rate limiting des commandes RCON"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_command_time
-        
-        if time_since_last < self.min_command_interval:
-            sleep_time = self.min_command_interval - time_since_last
-            logger.debug(f"Rate limiting: attente de {sleep_time:.2f} secondes")
-            time.sleep(sleep_time)
-        
-        self.last_command_time = time.time()
+        if self.connected and self.writer:
+            return
+        # Un seul coroutine (re)connecte, les autres attendent le résultat
+        async with self._connect_lock:
+            if not self.connected or not self.writer:
+                await self._connect()
+                if not self.connected:
+                    raise RuntimeError("Impossible de se connecter au serveur RCON")
 
     def _send_packet(self, req_id: int, type_id: int, payload: str):
         data   = payload.encode('utf8')
         length = 4 + 4 + len(data) + 2
         # length, requestId, typeId, payload, two null bytes
         pkt = struct.pack('<iii', length, req_id, type_id) + data + b'\x00\x00'
-        self.sock.sendall(pkt)
+        self.writer.write(pkt)
 
-    def _recv_packet(self):
-        # lire length
-        raw = self.sock.recv(4)
-        if len(raw) < 4:
-            raise ConnectionError("Réponse RCON incomplète")
+    async def _recv_packet(self):
+        # lire length puis le reste du paquet
+        raw = await self.reader.readexactly(4)
         length = struct.unpack('<i', raw)[0]
-        # lire le reste
-        data = b''
-        while len(data) < length:
-            chunk = self.sock.recv(length - len(data))
-            if not chunk:
-                break
-            data += chunk
+        data = await self.reader.readexactly(length)
         req_id, type_id = struct.unpack('<ii', data[:8])
         payload = data[8:-2].decode('utf8', errors='ignore')
         return req_id, type_id, payload
 
-    def _auth(self) -> bool:
-        # Utiliser un petit ID (1) pour l'authentification (type=3)
-        self._send_packet(1, 3, self.password)
-        req_id, type_id, _ = self._recv_packet()
-        return req_id != -1  # -1 = échec
+    async def _read_loop(self):
+        """Lit les paquets en continu et les remet à la requête correspondante"""
+        try:
+            while True:
+                req_id, type_id, payload = await self._recv_packet()
+                key = req_id
+                if self._auth_request_id is not None and key in (-1, self._auth_request_id):
+                    # Seul le paquet AUTH_RESPONSE compte (certains serveurs envoient d'abord un paquet vide),
+                    # et le serveur répond -1 à une authentification refusée
+                    if type_id != SERVERDATA_AUTH_RESPONSE:
+                        continue
+                    key = self._auth_request_id
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result((req_id, type_id, payload))
+                else:
+                    logger.debug(f"Paquet RCON sans requête en attente (id={req_id}, type={type_id})")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, asyncio.IncompleteReadError):
+                e = ConnectionResetError("Connexion RCON fermée par le serveur")
+            self.connected = False
+            self._fail_pending(e)
+
+    def _fail_pending(self, error):
+        """Fait échouer toutes les requêtes en attente (connexion perdue)"""
+        pending = self._pending
+        self._pending = {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(str(error)))
+
+    async def _request(self, type_id: int, payload: str):
+        """Envoie un paquet et attend la réponse portant le même identifiant"""
+        req_id = self._next_request_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req_id] = future
+        try:
+            self._send_packet(req_id, type_id, payload)
+            await self.writer.drain()
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(req_id, None)
 
-    def execute(self, command: str, auto_retry: bool = True) -> str:
+    async def _auth(self) -> bool:
+        self._auth_request_id = self._last_request_id % MAX_REQUEST_ID + 1
+        try:
+            req_id, _, _ = await self._request(SERVERDATA_AUTH, self.password)
+        finally:
+            auth_id, self._auth_request_id = self._auth_request_id, None
+        return req_id == auth_id  # -1 = échec
+
+    async def execute(self, command: str, auto_retry: bool = True, priority: int = PRIORITY_NORMAL) -> str:
         """Exécute une commande RCON avec gestion du rate limiting et reconnexion automatique"""
-        self._rate_limit_check()
-        
+        await self.limiter.acquire(priority)
+
         try:
-            self._ensure_connection()
-            
-            # Utiliser un autre ID (2) pour l'exécution de commande (type=2)
-            self._send_packet(2, 2, command)
-            _, _, payload = self._recv_packet()
-            
+            await self._ensure_connection()
+
+            _, _, payload = await self._request(SERVERDATA_EXECCOMMAND, command)
+
             # Vérifier si la réponse indique "Too many commands"
             if "Too many commands" in payload:
-                logger.warning(f"Rate limit RCON atteint pour la commande '{command}'. Attente de 5 secondes...")
-                time.sleep(5)  # Attendre 5 secondes avant de réessayer
+                # Le limiteur ralentit les commandes suivantes au lieu d'une pause fixe
+                logger.warning(f"Rate limit RCON atteint pour la commande '{command}'")
+                self.limiter.penalize()
                 raise RuntimeError("Too many commands, try again later")
-            
+
+            self.limiter.record_success()
             return payload
-            
-        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError, OSError) as e:
-            # Gestion spécifique des erreurs de connexion
+
+        except asyncio.TimeoutError:
+            # Réponse attendue trop longtemps : seule cette requête échoue (son id a quitté _pending),
+            # la connexion partagée et les autres requêtes en cours ne sont pas touchées.
+            # Pas de renvoi : le serveur a peut-être exécuté la commande.
+            logger.warning(f"Pas de réponse RCON à '{command}' après {self.timeout}s")
+            raise RuntimeError(f"Timeout RCON pour la commande '{command}'")
+
+        except (ConnectionError, OSError) as e:
+            # Connexion perdue (signalée par la boucle de lecture ou par l'écriture)
             logger.warning(f"Connexion RCON perdue lors de l'exécution de '{command}': {e}")
             self.connected = False
-            
+
             if auto_retry:
                 logger.info("Tentative de reconnexion automatique...")
                 try:
-                    self._connect()
+                    async with self._connect_lock:
+                        if not self.connected:
+                            await self._connect()
                     # Réessayer la commande une seule fois après reconnexion
-                    return self.execute(command, auto_retry=False)
+                    return await self.execute(command, auto_retry=False, priority=priority)
                 except Exception as reconnect_error:
                     logger.error(f"Échec de la reconnexion automatique: {reconnect_error}")
                     raise RuntimeError(f"Connexion RCON perdue et reconnexion échouée: {e}")
             else:
                 raise RuntimeError(f"Erreur RCON: {e}")
-                
+
         except Exception as e:
             logger.error(f"Erreur lors de l'exécution de la commande RCON '{command}': {e}")
             raise
 
-    def get_online_players(self) -> list[str]:
+    async def get_online_players(self, priority: int = PRIORITY_LOW) -> list[str]:
         """Récupère la liste des joueurs connectés avec reconnexion automatique"""
         max_attempts = 2  # Maximum 2 tentatives
-        
+
         for attempt in range(max_attempts):
             try:
-                self._ensure_connection()
-                
+                await self._ensure_connection()
+
                 # Essayer la commande GetPlayerList spécifique à Conan Exiles
                 try:
-                    resp_player_list = self.execute("GetPlayerList", auto_retry=(attempt == 0))
+                    resp_player_list = await self.execute("GetPlayerList", auto_retry=(attempt == 0), priority=priority)
                     logger.debug(f"Réponse de GetPlayerList: {resp_player_list}")
-                    
+
                     # Si la commande a fonctionné et retourne des données JSON valides
                     if resp_player_list and resp_player_list.strip() and "{" in resp_player_list:
                         try:
-                            # Nettoyer la réponse si nécessaire pour obtenir un JSON valide
-                            json_str = resp_player_list.strip()
-                            if json_str.startswith("Command 'GetPlayerList' succeeded!"):
-                                json_str = json_str.replace("Command 'GetPlayerList' succeeded!", "").strip()
-                            
-                            # Analyser le JSON
-                            player_data = json.loads(json_str)
-                            players = []
-                            
-                            # Format attendu: {"players": [{"playerId": 12345, "name": "PlayerName", "charName": "CharacterName"}, ...]}
-                            if "players" in player_data and isinstance(player_data["players"], list):
-                                for player in player_data["players"]:
-                                    # Utiliser le nom du personnage s'il existe, sinon le nom du joueur
-                                    if "charName" in player and player["charName"]:
-                                        players.append(player["charName"])
-                                    elif "name" in player and player["name"]:
-                                        players.append(player["name"])
-                            
-                                if players:
-                                    logger.info(f"Joueurs connectés via GetPlayerList: {players}")
-                                    return players
+                            # Utiliser le nom du personnage s'il existe, sinon le nom du joueur
+                            players = [record.char_name or record.player_name
+                                       for record in parse_player_list(resp_player_list)]
+                            if players:
+                                logger.info(f"Joueurs connectés via GetPlayerList: {players}")
+                                return players
                         except Exception as e:
                             logger.warning(f"Erreur lors du parsing du JSON de GetPlayerList: {e}")
                 except RuntimeError as e:
@@ -213,81 +260,78 @@ class RCONClient:
                         continue  # Réessayer avec ListPlayers
                     else:
                         raise
-                
+
                 # Si GetPlayerList n'a pas fonctionné, essayer avec ListPlayers
                 try:
-                    resp = self.execute("ListPlayers", auto_retry=(attempt == 0))
+                    resp = await self.execute("ListPlayers", auto_retry=(attempt == 0), priority=priority)
                     logger.debug(f"Réponse brute de ListPlayers: {resp}")
-                    
+
                     # Si aucun joueur n'est connecté
                     if "No players" in resp or not resp.strip():
                         logger.info("Aucun joueur connecté")
                         return []
-                    
+
                     # Vérifier si la réponse contient une erreur
                     if "Too many commands" in resp:
                         logger.warning("ListPlayers: Too many commands, retour liste vide")
                         return []
-                    
-                    # Analyser la liste des joueurs
-                    players = []
-                    lines = resp.split('\n')
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if line and not line.startswith('Command') and not line.startswith('Player'):
-                            # Format typique: "PlayerName (Steam ID: 76561198123456789)"
-                            if '(' in line:
-                                player_name = line.split('(')[0].strip()
-                                if player_name:
-                                    players.append(player_name)
-                            elif line:  # Si pas de parenthèses, prendre la ligne entière
-                                players.append(line)
-                    
+
+                    # Analyser la liste des joueurs (une ligne par joueur sous l'en-tête)
+                    players = [record.char_name or record.player_name for record in parse_player_list(resp)]
+
                     logger.info(f"Joueurs connectés via ListPlayers: {players}")
                     return players
-                    
+
                 except RuntimeError as e:
                     if "Connexion RCON perdue" in str(e) and attempt == 0:
                         logger.warning("ListPlayers: Connexion perdue, nouvelle tentative...")
                         continue  # Réessayer
                     else:
                         raise
-                        
+
                 # Si on arrive ici, les deux commandes ont échoué mais sans erreur de connexion
                 logger.warning("Aucune commande RCON n'a fonctionné, retour liste vide")
                 return []
-                
-            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError, OSError) as e:
+
+            except (ConnectionError, OSError) as e:
                 logger.error(f"Erreur de connexion RCON (tentative {attempt + 1}/{max_attempts}): {e}")
                 self.connected = False
-                
+
                 if attempt < max_attempts - 1:
                     logger.info("Tentative de reconnexion...")
                     try:
-                        time.sleep(2)  # Attendre 2 secondes avant de réessayer
-                        self._connect()
+                        await asyncio.sleep(2)  # Attendre 2 secondes avant de réessayer
+                        await self._connect()
                     except Exception as reconnect_error:
                         logger.error(f"Échec de la reconnexion: {reconnect_error}")
                         continue
                 else:
                     logger.error("Toutes les tentatives de reconnexion ont échoué")
                     raise RuntimeError(f"Erreur lors de la récupération des joueurs en ligne: {e}")
-                    
+
             except Exception as e:
                 logger.error(f"Erreur inattendue lors de la récupération des joueurs en ligne: {e}")
                 if attempt == max_attempts - 1:
                     raise RuntimeError(f"Erreur lors de la récupération des joueurs en ligne: {e}")
-        
+
         # Si on arrive ici, toutes les tentatives ont échoué
         logger.error("Impossible de récupérer la liste des joueurs après toutes les tentatives")
         return []
 
-    def close(self):
-        if self.sock:
+    async def _close_transport(self):
+        """Ferme la connexion courante et fait échouer les requêtes en attente"""
+        if self._read_task:
+            self._read_task.cancel()
+            self._read_task = None
+        if self.writer:
             try:
-                self.sock.close()
-            except:
+                self.writer.close()
+            except Exception:
                 pass
-        self.sock = None
+        self.reader = None
+        self.writer = None
+        self._fail_pending(ConnectionResetError("Connexion RCON fermée"))
+
+    async def close(self):
+        await self._close_transport()
         self.connected = False